@@ -0,0 +1,135 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 14:42:03 2026
+
+ingest benchmark on synthetic dumps (see tweet_dumps.py)
+
+functions provide
+1. generate (or reuse) a dump folder for every scale
+2. time the filtergeo ingest path on it in a fresh process per run, for
+   every worker count and mode
+3. record tweets/sec and peak memory in <workdir>/bench_ingest.csv, and a
+   run whose process died (out of memory at the large scales) as failed
+
+usage: python bench_ingest.py [--scales 10000,1000000,10000000] [--workers 1,4]
+                              [--modes default,geotagged,threaded] [--workdir DIR]
+
+@author: chenzhong
+"""
+
+import os
+import sys
+import time
+import argparse
+import resource
+from multiprocessing import Process, Queue
+try:
+    from queue import Empty
+except ImportError:
+    from Queue import Empty
+import numpy as np
+import pandas as pd
+
+import tweet_dumps
+import tweet_ingest
+
+MODES = {
+    'default': {},
+    'geotagged': {'geotagged_only': True},
+    'threaded': {'threaded': True},
+}
+
+# seconds between checks that the benchmark process is still alive
+POLL = 5
+
+
+def _peak_rss_mb(who):
+    # ru_maxrss is in kB on linux and in bytes on mac
+    rss = resource.getrusage(who).ru_maxrss
+    return rss / (1024.0 * 1024.0) if sys.platform == 'darwin' else rss / 1024.0
+
+
+def _run(directory, workers, options, queue):
+    start = time.time()
+    df = tweet_ingest.ingest_month(directory, workers, **options)
+    tweet_ingest.write_legacy_csv(df, directory + '.csv')
+    queue.put((time.time() - start, len(df),
+               _peak_rss_mb(resource.RUSAGE_SELF),
+               _peak_rss_mb(resource.RUSAGE_CHILDREN)))
+
+
+def run_once(directory, workers, options):
+    # one ingest in its own process, so every run starts from a clean heap
+    # and ru_maxrss is the peak of that run only. Returns (result, exitcode),
+    # result None when the process died without one (killed out of memory)
+    queue = Queue()
+    p = Process(target=_run, args=(directory, workers, options, queue))
+    p.start()
+    result = None
+    while True:
+        try:
+            result = queue.get(timeout=POLL)
+            break
+        except Empty:
+            if not p.is_alive():
+                # it may have put its result just before exiting
+                try:
+                    result = queue.get(timeout=1)
+                except Empty:
+                    pass
+                break
+    p.join()
+    return result, p.exitcode
+
+
+def dump_folder(workdir, n_tweets, tweets_per_file):
+    directory = os.path.join(workdir, 'dumps_%d' % n_tweets)
+    if not os.path.exists(directory):
+        print("writing %d synthetic tweets to %s" % (n_tweets, directory))
+        tweet_dumps.write_dumps(directory, n_tweets, tweets_per_file)
+    return directory
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='ingest benchmark on synthetic dumps')
+    parser.add_argument('--scales', default='10000,1000000,10000000')
+    parser.add_argument('--workers', default='1')
+    parser.add_argument('--modes', default='default')
+    parser.add_argument('--tweets-per-file', type=int, default=10000)
+    parser.add_argument('--workdir', default='bench_data')
+    args = parser.parse_args(argv)
+
+    rows = []
+    for n_tweets in [int(n) for n in args.scales.split(',')]:
+        directory = dump_folder(args.workdir, n_tweets, args.tweets_per_file)
+        nbytes = sum(os.path.getsize(f) for f in tweet_ingest.list_files(directory))
+        for workers in [int(w) for w in args.workers.split(',')]:
+            for mode in args.modes.split(','):
+                result, exitcode = run_once(directory, workers, MODES[mode])
+                row = {'scale': n_tweets, 'workers': workers, 'mode': mode}
+                if result is None:
+                    row.update(status='failed (exit code %s)' % exitcode, kept=np.nan,
+                               seconds=np.nan, tweets_per_s=np.nan, mb_per_s=np.nan,
+                               peak_rss_mb=np.nan, peak_rss_workers_mb=np.nan)
+                    print("%(scale)9d tweets %(workers)2d workers %(mode)-9s %(status)s" % row)
+                    rows.append(row)
+                    continue
+                seconds, kept, rss, rss_children = result
+                row.update(status='ok', kept=kept, seconds=seconds,
+                           tweets_per_s=n_tweets / seconds,
+                           mb_per_s=nbytes / seconds / 1e6,
+                           peak_rss_mb=rss, peak_rss_workers_mb=rss_children)
+                print("%(scale)9d tweets %(workers)2d workers %(mode)-9s "
+                      "%(seconds)8.1f s %(tweets_per_s)9.0f tweets/s "
+                      "%(peak_rss_mb)7.0f MB peak" % row)
+                rows.append(row)
+    out = os.path.join(args.workdir, 'bench_ingest.csv')
+    columns = ['scale', 'workers', 'mode', 'status', 'kept', 'seconds', 'tweets_per_s',
+               'mb_per_s', 'peak_rss_mb', 'peak_rss_workers_mb']
+    pd.DataFrame(rows, columns=columns).to_csv(out, header=True, index=False)
+    print("results in %s" % out)
+
+
+if __name__ == '__main__':
+    main()
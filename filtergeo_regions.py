@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 10:05:12 2026
+
+functions provide
+1. iterate over the hourly files of the raw tweet archive once
+2. write the csv of every region in the registry (see tweet_ingest.py)
+
+@author: chenzhong
+"""
+
+import tweet_ingest
+from tweet_ingest import Region
+from tweet_dedup import IdIndex
+from ingest_stats import IngestReport, report_prefix
+
+dire_name = list(['2014-07','2014-08','2014-09','2014-10','2014-11','2014-12','2015-01','2015-02',
+             '2015-03','2015-04','2015-05','2015-06','2015-07','2015-08','2015-09',
+             '2015-10','2015-11','2015-12','2016-01','2016-02','2016-03',
+             '2016-04','2016-05','2016-06','2016-07','2016-08','2016-09',
+             '2016-10','2016-11','2016-12','2017-01','2017-02','2017-03','2017-04','2017-05','2017-06'])
+
+# number of processes reading the hourly files, 1 keeps everything in this one
+workers = 1
+
+# skip tweets without coordinates, most lines are rejected before json decoding
+geotagged_only = False
+
+# drop tweets whose id was already seen in the same region
+dedup = False
+
+data = '/Volumes/FREESPACE/workspace/python/twitter_analysis/data/'
+source = data + 'tweet-extractor/'
+
+# a new city is one more line here, the archive is still decoded once
+regions = [
+    Region('london', (51.2, 51.8), (-0.7, 0.4), data + 'tweet-extractor-london/'),
+    Region('kenya', (-6.0, 6.0), (32.0, 43.0), data + 'tweet-extractor-Kenya/'),
+]
+
+# the worker processes import this file again (spawn on mac), so the run
+# only starts from the main one
+if __name__ == '__main__':
+    # per-file counts, timings and throughput, written to source + 'ingest_report_*'
+    report = IngestReport()
+    tweet_ingest.filter_regions([source + name for name in dire_name], regions, workers=workers,
+                                dedup=dict((r.name, IdIndex()) for r in regions) if dedup else None,
+                                report=report, geotagged_only=geotagged_only)
+    report.write(report_prefix(source))
+    report.print_summary()
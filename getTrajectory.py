@@ -1,4 +1,4 @@
-#!/usr/bin/env python2
+#!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 """
 Created on Sat May 26 19:43:47 2018
@@ -23,10 +23,6 @@ from mpl_toolkits.mplot3d import Axes3D
 import matplotlib.pyplot as plt
 import numpy as np
 
-import sys
-reload(sys)
-sys.setdefaultencoding("ISO-8859-1")
-
 # Set ipython's max row display
 pd.set_option('display.max_row', 1000)
 
@@ -35,7 +31,6 @@ pd.set_option('display.max_columns', 50)
 
 import pandas as pd
 import geopandas as gpd
-from shapely.geometry import Point
 
 
 
@@ -51,84 +46,74 @@ from shapely.geometry import Point
 
 directory = '/Volumes/FREESPACE/workspace/python/twitter_analysis/data/tweet-extractor-london/tw_15_17.csv'
 
-from datetime import datetime
-
-def convert_toSecond(t):
-    return time.mktime(t.timetuple())
-
+import tweet_time
+import tweet_frame
+import tweet_geocode
+import tweet_trajectory
 
-def make_point(row):
-    return Point(row.lon, row.lat)
+# the map workers import this file again (spawn on mac), so the run only
+# starts from the main process
+if __name__ == '__main__':
+    # int64 id/userid, float lat/lon, int64 epoch created_at, categorical location
+    tw = tweet_frame.read_csv(directory)
 
-tw = pd.read_csv(open(directory,'rU'), encoding='utf-8', engine='c', header = 0, 
-                 error_bad_lines=False,parse_dates=True)
-tw.columns = ['id','text','userid','lat','lon','created_at','location']
+    tw['time'] = tweet_time.epoch_seconds(tw['created_at'])
+    points = tweet_geocode.make_points(tw['lon'].values, tw['lat'].values)
+    tw_points = gpd.GeoDataFrame(tw, geometry=points, crs=tweet_geocode.WGS84)
 
-tw['created_at'] =  pd.to_datetime(tw['created_at'], format='%Y-%m-%d %H:%M:%S.%f')
 
-c = tw.created_at.apply(lambda x: convert_toSecond(x))
-tw['time'] = c
-tw['userid'] = tw['userid'].astype(object)
-tw = tw.sort_values(by = 'time', ascending = True)
-points = tw.apply(make_point, axis=1)
-tw_points = gpd.GeoDataFrame(tw, geometry=points)
-tw_points.crs = {'init': 'epsg:4326'}
 
+    users_dire = '/Volumes/FREESPACE/workspace/python/twitter_analysis/data/tweet-extractor-london/sel_user1.csv'
+    sel_user = pd.read_csv(users_dire, dtype={'user_id': str})
+    sel_user['user_id'] = tweet_frame.as_int64(sel_user['user_id'])
 
-
-users_dire = '/Volumes/FREESPACE/workspace/python/twitter_analysis/data/tweet-extractor-london/sel_user1.csv'
-sel_user = pd.read_csv(users_dire)
-
-import geopandas as gpd
-geo_dire = '/Volumes/FREESPACE/workspace/python/twitter_analysis/data/tweet-extractor-london/london_borough.shp'
-london = gpd.read_file(geo_dire)
+    import geopandas as gpd
+    geo_dire = '/Volumes/FREESPACE/workspace/python/twitter_analysis/data/tweet-extractor-london/london_borough.shp'
+    london = gpd.read_file(geo_dire)
         
-geo_dire_msoa = '/Volumes/FREESPACE/workspace/python/twitter_analysis/data/tweet-extractor-london/london_msoa.shp'
-london_msoa = gpd.read_file(geo_dire_msoa)
-
-tw_in_msoa = gpd.sjoin(tw_points, london_msoa, op ='within')
-
-london_msoa = london_msoa.drop(columns=['LA_NAME', 'GEOEAST' ,'GEONORTH', 'POPEAST','POPNORTH', 'AREA_KM2'])
-
-cmap = matplotlib.cm.get_cmap('jet')
-norm = matplotlib.colors.Normalize(tw['time'].min(), tw['time'].max())
-color_producer = matplotlib.cm.ScalarMappable(norm=norm, cmap=cmap)
-rgba = color_producer.to_rgba(tw['time'])
-
-
-for i in range(100):
-    print(i)
-    tw_user = tw_points[tw['userid'] == sel_user.iloc[i]['user_id']]
-    rgba_s = rgba[tw['userid'] == sel_user.iloc[i]['user_id']]
-    f, ax = plt.subplots(1, figsize=(10, 8))
-    ax = london.plot(axes=ax, color='lightgrey', linewidth=0.5, edgecolor='white', figsize=(15,5))
-    ax.set_ylim(51.2,51.80)
-    ax.set_xlim(-0.7, 0.4)
-    # Pass ax=ax to the second layer
-    tw_user.plot(markersize=10, color=rgba_s, alpha=1, axes=ax)
-    ax.axis('off')
-
-    '''
-    ax = fig.add_subplot(111, projection='3d')
-    ax.scatter(tw_user['lat'], tw_user['lon'], tw_user['time'], c = tw_user['time'])
-    ax.set_xlabel('X Label')
-    ax.set_ylabel('Y Label')
-    ax.set_zlabel('Z Label')
-    '''
-    #plt.show() 
-    plt.savefig('fig/'+str(tw_user.iloc[i]['userid']) + '.png')
-
-
-    
-    
-    plt.scatter(tweets.lat, tweets.lon)
-
-
-
-
-
-
-
-
-
-
+    geo_dire_msoa = '/Volumes/FREESPACE/workspace/python/twitter_analysis/data/tweet-extractor-london/london_msoa.shp'
+    london_msoa = gpd.read_file(geo_dire_msoa)
+
+    # msoa and borough codes from one pass over the points; with grid_cell
+    # (metres) set, through grid lookups cached next to the shapefiles
+    grid_cell = 100
+    msoa = tweet_geocode.read_layer(geo_dire_msoa, 'MSOA11CD', cell_size=grid_cell)
+    borough = tweet_geocode.read_layer(geo_dire, 'GSS_CODE', 'borough', cell_size=grid_cell)
+    areas = tweet_geocode.assign_areas(tw['lon'].values, tw['lat'].values, [msoa, borough])
+    tw_points['MSOA11CD'] = areas['MSOA11CD'].values
+    tw_points['borough'] = areas['borough'].values
+    tw_in_msoa = tw_points[tw_points['MSOA11CD'].notnull()]
+    # msoa as the position of the code in london_msoa.shp, -1 outside
+    tw['msoa'] = pd.Categorical(areas['MSOA11CD'].values, categories=msoa.codes).codes
+
+    # users' time-ordered points, sorted once and kept next to the csv instead
+    # of sort_values and a full-frame mask per user; only the tweets with
+    # coordinates and a time, place-only ones have no point to map or move
+    located = np.isfinite(tw['lon'].values) & np.isfinite(tw['lat'].values) & \
+        (tw['time'].values != tweet_time.NAT)
+    trajectories = tweet_trajectory.trajectory_index(tw[located], directory,
+                                                     columns=('lon', 'lat', 'msoa'))
+
+    # stay points, radius of gyration, displacements and msoas per quarter of
+    # every user
+    import tweet_mobility
+    stays = tweet_mobility.stay_points(trajectories)
+    mobility = tweet_mobility.user_metrics(trajectories)
+    msoa_per_quarter = tweet_mobility.areas_per_quarter(trajectories, area='msoa')
+
+    # tweets sorted once by time for period / hour / weekday selections, e.g.
+    # the selected users' weekend evenings in summer 2016
+    import tweet_window
+    times = tweet_window.TimeIndex.from_frame(tw, columns=('id', 'userid', 'lon', 'lat', 'msoa'))
+    summer_evenings = times.frame(times.select(period='2016-Q3', hours=range(18, 24), weekdays=[5, 6],
+                                               users=sel_user['user_id'].values))
+
+    london_msoa = london_msoa.drop(columns=['LA_NAME', 'GEOEAST' ,'GEONORTH', 'POPEAST','POPNORTH', 'AREA_KM2'])
+
+    # maps of the selected users, fig/<userid>.png, coloured by time over one
+    # rasterized borough basemap; the scale leaves out tweets without a time
+    dated = tw['time'].values[tw['time'].values != tweet_time.NAT]
+    import tweet_maps
+    basemap = tweet_maps.rasterize(london)
+    tweet_maps.render_users(trajectories, sel_user['user_id'].values[:100], basemap, 'fig',
+                            workers=4, norm=(dated.min(), dated.max()))
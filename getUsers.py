@@ -1,4 +1,4 @@
-#!/usr/bin/env python2
+#!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 """
 Created on Sun May 27 22:37:59 2018
@@ -21,300 +21,105 @@ from mpl_toolkits.mplot3d import Axes3D
 import matplotlib.pyplot as plt
 import numpy as np
 
+
 pd.set_option('display.float_format', lambda x: '%.f' % x)
 
 all_user = pd.read_table('/Volumes/FREESPACE/workspace/python/twitter_analysis/data/tweet-extractor-london/users_15_17.csv', header = None)
 all_user.columns = ['user_id']
 
-user_15_q3 = pd.read_table('/Volumes/FREESPACE/workspace/python/twitter_analysis/data/tweet-extractor-london/users_15_q3.csv', header = None, sep = ',') 
-user_15_q3.columns = ['user_id','rec_15q3','loc_15q3']
-user_15_q3['user_id'] = user_15_q3['user_id'].astype(object)
-user_15_q3['user_id'] = user_15_q3['user_id'].astype(str)
-user_15_q3['user_id'] = user_15_q3['user_id'].map(lambda x: x.rstrip('.0'))
-user_15_q3 = user_15_q3.reindex()
-    
-    
-user_15_q4 = pd.read_table('/Volumes/FREESPACE/workspace/python/twitter_analysis/data/tweet-extractor-london/users_15_q4.csv', header = None, sep = ',')
-user_15_q4.columns = ['user_id','rec_15q4','loc_15q4']
-user_15_q4['user_id'] = user_15_q4['user_id'].astype(object)
-user_15_q4['user_id'] = user_15_q4['user_id'].astype(str)
-user_15_q4['user_id'] = user_15_q4['user_id'].map(lambda x: x.rstrip('.0'))
-user_15_q4 = user_15_q4.reindex()
-
-user_16_q1 = pd.read_table('/Volumes/FREESPACE/workspace/python/twitter_analysis/data/tweet-extractor-london/users_16_q1.csv', header = None, sep = ',')
-user_16_q1.columns = ['user_id','rec_16q1','loc_16q1']
-user_16_q1['user_id'] = user_16_q1['user_id'].astype(object)
-user_16_q1['user_id'] = user_16_q1['user_id'].astype(str)
-user_16_q1['user_id'] = user_16_q1['user_id'].map(lambda x: x.rstrip('.0'))
-user_16_q1 = user_16_q1.reindex()
-    
-user_16_q2 = pd.read_table('/Volumes/FREESPACE/workspace/python/twitter_analysis/data/tweet-extractor-london/users_16_q2.csv', header = None, sep = ',')
-user_16_q2.columns = ['user_id','rec_16q2','loc_16q2']
-user_16_q2['user_id'] = user_16_q2['user_id'].astype(object)
-user_16_q2['user_id'] = user_16_q2['user_id'].astype(str)
-user_16_q2['user_id'] = user_16_q2['user_id'].map(lambda x: x.rstrip('.0'))
-user_16_q2 = user_16_q2.reindex()
-    
-user_16_q3 = pd.read_table('/Volumes/FREESPACE/workspace/python/twitter_analysis/data/tweet-extractor-london/users_16_q3.csv', header = None, sep = ',')
-user_16_q3.columns = ['user_id','rec_16q3','loc_16q3']
-user_16_q3['user_id'] = user_16_q3['user_id'].astype(object)
-user_16_q3['user_id'] = user_16_q3['user_id'].astype(str)
-user_16_q3['user_id'] = user_16_q3['user_id'].map(lambda x: x.rstrip('.0'))
-user_16_q3 = user_16_q3.reindex()
-    
-user_16_q4 = pd.read_table('/Volumes/FREESPACE/workspace/python/twitter_analysis/data/tweet-extractor-london/users_16_q4.csv', header = None, sep = ',')
-user_16_q4.columns = ['user_id','rec_16q4','loc_16q4']
-user_16_q4['user_id'] = user_16_q4['user_id'].astype(object)
-user_16_q4['user_id'] = user_16_q4['user_id'].astype(str)
-user_16_q4['user_id'] = user_16_q4['user_id'].map(lambda x: x.rstrip('.0'))
-user_16_q4 = user_16_q4.reindex()
-    
-user_17_q1 = pd.read_table('/Volumes/FREESPACE/workspace/python/twitter_analysis/data/tweet-extractor-london/users_17_q1.csv', header = None, sep = ',')
-user_17_q1.columns = ['user_id','rec_17q1','loc_17q1']
-user_17_q1['user_id'] = user_17_q1['user_id'].astype(object)
-user_17_q1['user_id'] = user_17_q1['user_id'].astype(str)
-user_17_q1['user_id'] = user_17_q1['user_id'].map(lambda x: x.rstrip('.0'))
-user_17_q1 = user_17_q1.reindex()
-    
-user_17_q2 = pd.read_table('/Volumes/FREESPACE/workspace/python/twitter_analysis/data/tweet-extractor-london/users_17_q2.csv', header = None, sep = ',')
-user_17_q2.columns = ['user_id','rec_17q2','loc_17q2']
-user_17_q2['user_id'] = user_17_q2['user_id'].astype(object)
-user_17_q2['user_id'] = user_17_q2['user_id'].astype(str)
-user_17_q2['user_id'] = user_17_q2['user_id'].map(lambda x: x.rstrip('.0'))
-user_17_q2 = user_17_q2.reindex()
-
-
-userids = user_15_q3['user_id']
-userids = userids.append(user_15_q4['user_id'])
-userids = userids.append(user_16_q1['user_id'])
-userids = userids.append(user_16_q2['user_id'])
-userids = userids.append(user_16_q3['user_id'])
-userids = userids.append(user_16_q4['user_id'])
-userids = userids.append(user_17_q1['user_id'])
-userids = userids.append(user_17_q2['user_id'])
-userids = userids.unique()
-
-userids = pd.DataFrame(userids)
-userids.columns = ['user_id']
-userids = userids.reindex()
-len(userids)
-#right_index=True
-
-
-test = pd.merge(userids, user_15_q3, on=['user_id'] , how = 'left')
-test = test.reindex()
-len(test)
-
-test = pd.merge(test, user_15_q4, on=['user_id'] , how = 'left')
-test = test.reindex()
-len(test)
-
-test = pd.merge(test, user_16_q1, on=['user_id'] , how = 'left')
-test = test.reindex()
-len(test)
-
-test = pd.merge(test, user_16_q2, on=['user_id'] , how = 'left')
-test = test.reindex()
-len(test)
-
-test = pd.merge(test, user_16_q3, on=['user_id'] , how = 'left')
-test = test.reindex()
-len(test)
-
-test = pd.merge(test, user_16_q4, on=['user_id'] , how = 'left')
-test = test.reindex()
-len(test)
-
-test = pd.merge(test, user_17_q1, on=['user_id'] , how = 'left')
-test = test.reindex()
-len(test)
-
-test = pd.merge(test, user_17_q2, on=['user_id'] , how = 'left')
-test = test.reindex()
-len(test)
-
-test0 = test[['user_id','rec_15q3','rec_15q4',\
-              'rec_16q1','rec_16q2','rec_16q3','rec_16q4',\
-              'rec_17q1','rec_17q2',\
-              'loc_15q3','loc_15q4',\
-              'loc_16q1','loc_16q2','loc_16q3','loc_16q4',\
-              'loc_17q1','loc_17q2']]
-
-test1 = test0.fillna(0)
-
-col = test1.columns[1:]
-for i in col:
-    test1[i] = test1[i].astype(int)
-
-
-test1['avg_rec'] = np.mean(test1.iloc[:,1:9], axis = 1)
-test1['avg_loc'] = np.mean(test1.iloc[:,9:17], axis = 1)
-test1['min_loc'] = np.min(test1.iloc[:,9:17], axis = 1)
-test1['max_loc'] = np.max(test1.iloc[:,9:17], axis = 1)
-test1['min_rec'] = np.min(test1.iloc[:,1:9], axis = 1)
-test1['max_rec'] = np.max(test1.iloc[:,1:9], axis = 1)
-
-test1 = test1[test1['min_loc']>0]
+# records and distinct locations of every user per quarter, with the
+# avg/min/max and records-per-location columns; later quarters are added
+# by moving the last one
+import user_activity
+root = '/Volumes/FREESPACE/workspace/python/twitter_analysis/data/tweet-extractor-london/'
+quarters = user_activity.quarters_between('2015-Q3', '2017-Q2')
 
+# regenerate the users_YY_qN.csv files from the tweet store in one pass,
+# locations counted by place name ('place'), 'msoa' or rounded 'coords'
+regenerate = False
+store = '/Volumes/FREESPACE/workspace/python/twitter_analysis/data/tweet-store'
+if regenerate:
+    counts = user_activity.aggregate_store(store, 'london', quarters[0] + '..' + quarters[-1], by='place')
+    user_activity.write_users(counts, root)
 
+test1 = user_activity.build(root, quarters)
+len(test1)
 
-test1['avg_15q3'] = test1['rec_15q3']/test1['loc_15q3']
-test1['avg_15q4'] = test1['rec_15q4']/test1['loc_15q4']
-test1['avg_16q1'] = test1['rec_16q1']/test1['loc_16q1']
-test1['avg_16q2'] = test1['rec_16q2']/test1['loc_16q2']
-test1['avg_16q3'] = test1['rec_16q3']/test1['loc_16q3']
-test1['avg_16q4'] = test1['rec_16q4']/test1['loc_16q4']
-test1['avg_17q1'] = test1['rec_17q1']/test1['loc_17q1']
-test1['avg_17q2'] = test1['rec_17q2']/test1['loc_17q2']
+test1 = test1[test1['min_loc']>0]
 
-sel = test1
 
-def remove_std(df, attr):
-    #keep only the ones that are within +3 to -3 standard deviations 
-    df = df[np.abs(df[attr]-df[attr].mean())<=( 5 *df[attr].std())]
-    return df
+# the old remove_std / remove_quantile chains as filter specs: each rule
+# takes its mean/std/quantiles from the users kept by the rules before it,
+# one mask over test1 and a copy only for the selections kept
+import user_filters
+rec = user_activity.quarter_columns('rec', quarters)
+loc = user_activity.quarter_columns('loc', quarters)
+avg = user_activity.quarter_columns('avg', quarters)
+kept = user_filters.evaluate(test1, [user_filters.std_band(avg, 5)])
 
-def remove_quantile(df,attr, min_q, max_q):
-    df = df[(df[attr] < df[attr].quantile(max_q)) & (df[attr] > df[attr].quantile(min_q))]
-    return df
+sel0 = test1[user_filters.evaluate(test1, [user_filters.quantile_band('avg_rec', 0.94, 1)], kept)]
+len(sel0)
 
-colnames = sel.columns[-8:]
-for index in range(len(colnames)):
-    #sel = sel[sel[colnames[index]]>1]
-    sel = remove_std(sel, colnames[index])
+kept = user_filters.evaluate(test1, [user_filters.std_band(['avg_loc', 'max_rec'], 5)], kept)
+sel1 = test1[user_filters.evaluate(test1, [user_filters.threshold('min_rec', above=4)], kept)]
 
-sel0 = remove_quantile(sel, 'avg_rec', 0.94,1)
-len(sel0)
+# records and locations of every quarter, then the averages of all but the
+# last year's quarters, the locations of all but the last quarter and the
+# one before it, named from quarters so any period keeps its meaning
+sel = user_filters.apply(test1, [
+    user_filters.quantile_band(rec + loc, 0.75, 1),
+    user_filters.std_band(rec + loc + user_activity.SUMMARY + avg[:-4], 5),
+    user_filters.threshold(loc[:-1], above=1),
+    user_filters.quantile_band(loc[-2], 0.9, 1),
+], kept)
 
-sel = remove_std(sel, 'avg_loc')
-sel = remove_std(sel, 'max_rec')
-sel1 = sel[sel['min_rec']>4]
-
-
-colnames = sel.columns[1:17]
-for index in range(len(colnames)):
-    #sel = sel[sel[colnames[index]]>1]
-    sel = remove_quantile(sel, colnames[index],0.75,1)
-    
-    
-colnames = sel.columns[1:-4]
-for index in range(len(colnames)):
-    #sel = sel[sel[colnames[index]]>1]
-    sel = remove_std(sel, colnames[index])
-    
-    
-
-    
-colnames = sel.columns[9:16]
-for index in range(len(colnames)):
-    sel = sel[sel[colnames[index]]>1]
-
-    
 sel0['user_id'].to_csv('/Volumes/FREESPACE/workspace/python/twitter_analysis/data/tweet-extractor-london/sel_user1.csv',header = True, index = False)
-    
-    
-sel = remove_quantile(sel,colnames[index],0.9, 0.9999999999999999999999)
 
 names = '('
 for n in range(len(sel)):
-    names = names + '\''+ sel.iloc[n]['user_id'] + '\',' 
+    names = names + '\''+ str(sel.iloc[n]['user_id']) + '\',' 
 
 #connect to mysql
 import mysql.connector
 from mysql.connector import errorcode
+import tweet_db
 
-cnx = mysql.connector.connect(user='root', password='111111',
-                              host='localhost',
-                              database='kenya_tw',
-                              charset = 'utf8mb4')
-
-cursor = cnx.cursor(buffered=True)
-
+# one connection for the whole script; query results kept on local disk
+# for a week, so a rerun does not go back to the database
+pool = tweet_db.ConnectionPool(mysql.connector, user='root', password='111111',
+                               host='localhost',
+                               database='kenya_tw',
+                               charset = 'utf8mb4')
+cache = tweet_db.QueryCache(root + 'query_cache/')
 
 query = ("SELECT * from kenya_tw.active_user ")
-cursor.execute(query)
-
-df = pd.read_sql(query, cnx)
-cursor.close()
-cnx.close()
-    
-
-
-######
-
-#connect to mysql
-import mysql.connector
-from mysql.connector import errorcode
-
-cnx = mysql.connector.connect(user='root', password='111111',
-                              host='localhost',
-                              database='kenya_tw',
-                              charset = 'utf8mb4')
-
-cursor = cnx.cursor(buffered=True)
-query = ("SELECT * from kenya_tw.active_user ")
-cursor.execute(query)
-
-df = pd.read_sql(query, cnx)
-cursor.close()
-cnx.close()
+df = tweet_db.read_sql(pool, query, cache=cache)
 
 df['avg_rec'] = np.mean(df.iloc[:,1:5], axis = 1)
 df['avg_loc'] = np.mean(df.iloc[:,5:9], axis = 1)
 df['sum_rec'] = np.sum(df.iloc[:,1:5], axis = 1)
 
-#select these 
-df_sel = df.loc[(df['avg_rec']>1) & (df['avg_loc'] >1)]
-
-def remove_std_right(df, attr):
-    #keep only the ones that are within +3 to -3 standard deviations 
-    df = df[np.abs(df[attr]-df[attr].mean())<=( 0.5 *df[attr].std())]
-    return df
-
-def convert_toSecond(t):
-    return time.mktime(t.timetuple())
+#select these, then keep those within 0.5 standard deviations
+df_sel = user_filters.apply(df, [user_filters.threshold(['avg_rec', 'avg_loc'], above=1),
+                                 user_filters.std_band(['avg_rec', 'avg_loc'], 0.5)])
 
-df_sel = remove_std_right(df_sel, 'avg_rec')
-df_sel = remove_std_right(df_sel, 'avg_loc')
+import tweet_time
 
 
 plt.scatter(df_sel.avg_rec, df_sel.avg_loc)
 
-cnx = mysql.connector.connect(user='root', password='111111',
-                              host='localhost',
-                              database='kenya_tw',
-                              charset = 'utf8mb4')
-
-cursor = cnx.cursor(buffered=True)
 df_sel = df_sel.sort_values(by=['avg_rec'],ascending=False)
 
-tweets_active = []
-
-for index in range(100):
-    print(index)
-    query1 = ("SELECT * from kenya_tw.tweets_kenya_14 where userid = " + df_sel.iloc[index]['userid'] + " and lat <> '' ")
-    query2 = ("SELECT * from kenya_tw.tweets_kenya_15 where userid = " + df_sel.iloc[index]['userid'] + " and lat <> '' ")
-    query3 = ("SELECT * from kenya_tw.tweets_kenya_16 where userid = " + df_sel.iloc[index]['userid'] + " and lat <> '' ")
-    query4 = ("SELECT * from kenya_tw.tweets_kenya_17 where userid = " + df_sel.iloc[index]['userid'] + " and lat <> '' ")
-    cursor.execute(query1)
-    tweets = pd.read_sql(query1, cnx)
-    cursor.execute(query2)
-    tweets = tweets.append(pd.read_sql(query2, cnx))
-    cursor.execute(query3)
-    tweets = tweets.append(pd.read_sql(query3, cnx))
-    cursor.execute(query4)
-    tweets = tweets.append(pd.read_sql(query4, cnx))
-    c = tweets.created_at.apply(lambda x: convert_toSecond(x))
-    tweets['time'] = c
-    tweets['lat'] = tweets['lat'].astype(float)
-    tweets['lon'] = tweets['lon'].astype(float)
-    if index == 0:
-        tweets_active = tweets
-    else:
-        tweets_active = tweets_active.append(tweets)
-
-cursor.close()
-cnx.close() 
+# geotagged tweets of the 100 most active users from the four yearly
+# tables, tweet_db.CHUNK users per query on one connection
+tables = ['kenya_tw.tweets_kenya_14', 'kenya_tw.tweets_kenya_15',
+          'kenya_tw.tweets_kenya_16', 'kenya_tw.tweets_kenya_17']
+tweets_active = tweet_db.fetch_users(pool, tables, df_sel['userid'].values[:100], where="lat <> ''")
+tweets_active['time'] = tweet_time.epoch_seconds(tweets_active['created_at'])
+tweets_active['lat'] = tweets_active['lat'].astype(float)
+tweets_active['lon'] = tweets_active['lon'].astype(float)
+
+pool.close() 
 
 
 
@@ -0,0 +1,177 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 11:48:05 2026
+
+incremental ingest of a month folder
+
+functions provide
+1. keep a manifest of the hourly files already in the month csv
+   (path, size, mtime, rows, output and the byte range of their rows)
+2. append only new or changed files to the existing month output
+3. resume a crashed run from the last completed file
+4. keep a persistent tweet id index in step with the month csv files
+
+@author: chenzhong
+"""
+
+import os
+from collections import Counter
+import pandas as pd
+
+import tweet_ingest
+from tweet_dedup import IdIndex, csv_ids, drop_duplicates
+
+MANIFEST_COLUMNS = ['path', 'size', 'mtime', 'rows', 'output', 'offset', 'end']
+
+
+def manifest_name(directory):
+    return directory + '.manifest.csv'
+
+
+def file_state(filename):
+    st = os.stat(filename)
+    return st.st_size, st.st_mtime
+
+
+class Manifest(object):
+    # rows of the manifest are in the order the files were appended, so the
+    # output can always be cut back to the end of the last completed file
+
+    def __init__(self, filename):
+        self.filename = filename
+        if os.path.exists(filename):
+            self.df = pd.read_csv(filename, encoding='utf-8')
+        else:
+            self.df = pd.DataFrame(columns=MANIFEST_COLUMNS)
+
+    def __len__(self):
+        return len(self.df)
+
+    def end(self):
+        # byte size of the output covered by completed files
+        if len(self.df) == 0:
+            return 0
+        return int(self.df['end'].iloc[-1])
+
+    def changed(self, filename):
+        # True for a recorded file that was rewritten since, None if new
+        rec = self.df[self.df['path'] == filename]
+        if len(rec) == 0:
+            return None
+        size, mtime = file_state(filename)
+        return bool(rec['size'].iloc[0] != size or abs(rec['mtime'].iloc[0] - mtime) > 1e-6)
+
+    def cut(self, filenames):
+        # forget the first of filenames to be appended and every file after
+        # it, returning the byte offset their rows started at
+        pos = int(self.df['path'].isin(filenames).values.argmax())
+        offset = int(self.df['offset'].iloc[pos])
+        self.df = self.df.iloc[:pos]
+        return offset
+
+    def clear(self):
+        self.df = self.df.iloc[:0]
+
+    def record(self, filename, size, mtime, rows, output, offset, end):
+        rec = pd.DataFrame([[filename, size, mtime, rows, output, offset, end]],
+                           columns=MANIFEST_COLUMNS)
+        self.df = pd.concat([self.df, rec], ignore_index=True)
+        self.save()
+
+    def save(self):
+        tmp = self.filename + '.tmp'
+        self.df.to_csv(tmp, encoding='utf-8', header=True, index=False)
+        os.rename(tmp, self.filename)
+
+
+def pending_files(directory, manifest):
+    # files of the month not in the manifest yet; a changed file takes the
+    # files appended after it back out so their rows are written again
+    files = tweet_ingest.list_files(directory)
+    changed = [f for f in files if manifest.changed(f)]
+    if changed:
+        offset = manifest.cut(changed)
+    else:
+        offset = manifest.end()
+    done = set(manifest.df['path'])
+    return [f for f in files if f not in done], offset
+
+
+def header_end(csvname):
+    # byte offset of the first row of a csv
+    with open(csvname, 'rb') as f:
+        return len(f.readline())
+
+
+def sync_index(dedup, manifest, csvname, offset):
+    # bring the ids of csvname in the index to the rows up to offset: the
+    # ids of rows about to be cut go out, completed rows a crashed run did
+    # not get to save come in
+    covered = dedup.covered.get(csvname, 0)
+    if len(manifest) == 0:
+        # the csv is about to be rebuilt from its first row, so every id
+        # the index took from it goes out first, or the rebuild would drop
+        # all of its tweets as duplicates
+        if covered:
+            if not os.path.exists(csvname):
+                raise RuntimeError("%s is gone but %d bytes of its ids are in the index; "
+                                   "rebuild the index without it" % (csvname, covered))
+            dedup.discard(csv_ids(csvname, header_end(csvname), covered))
+        dedup.covered[csvname] = 0
+        return
+    start = int(manifest.df['offset'].iloc[0])
+    covered = max(covered, start)
+    if covered > offset:
+        dedup.discard(csv_ids(csvname, offset, covered))
+    elif covered < offset:
+        dedup.add(csv_ids(csvname, covered, offset))
+    dedup.covered[csvname] = offset
+
+
+def update_month(directory, workers=1, dedup=None, **options):
+    # append the rows of new or changed hourly files to directory + '.csv';
+    # rerunning after a crash carries on from the last completed file.
+    # dedup is an IdIndex kept in step with the csv across runs
+    csvname = directory + '.csv'
+    manifest = Manifest(manifest_name(directory))
+    if not os.path.exists(csvname):
+        manifest.clear()
+    files, offset = pending_files(directory, manifest)
+    if dedup is not None:
+        sync_index(dedup, manifest, csvname, offset)
+    if len(manifest) == 0:
+        tweet_ingest.to_legacy_frame(tweet_ingest.empty_frame()).to_csv(
+            csvname, sep=',', encoding='utf-8', header=True, index=False)
+    else:
+        # drop rows a crashed run wrote after its last completed file
+        with open(csvname, 'r+b') as f:
+            f.truncate(offset)
+    states = [file_state(f) for f in files]
+    results = tweet_ingest.iter_batches(files, workers, **options)
+    count = 0
+    stats = Counter()
+    for filename, (size, mtime), (batch, counts) in zip(files, states, results):
+        stats.update(counts)
+        if dedup is not None:
+            batch = drop_duplicates(batch, dedup, stats)
+        offset = os.path.getsize(csvname)
+        rows = tweet_ingest.to_legacy_frame(batch)
+        rows.to_csv(csvname, mode='a', sep=',', encoding='utf-8', header=False, index=False)
+        manifest.record(filename, size, mtime, len(rows), csvname,
+                        offset, os.path.getsize(csvname))
+        count = count + len(rows)
+    if dedup is not None:
+        dedup.covered[csvname] = os.path.getsize(csvname)
+    print("%s %d new files, count of tweet %d" % (directory, len(files), count))
+    tweet_ingest.report_counts(stats)
+    return count
+
+
+def update_months(directories, workers=1, dedup_file=None, **options):
+    # dedup_file is where the id index lives between runs, None for no dedup
+    dedup = IdIndex.load(dedup_file) if dedup_file else None
+    for directory in directories:
+        update_month(directory, workers, dedup, **options)
+        if dedup is not None:
+            dedup.save(dedup_file)
@@ -0,0 +1,84 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 13:31:52 2026
+
+run report of the ingest, to follow throughput across collector format changes
+
+functions provide
+1. collect the per-file counters and timings of tweet_ingest.read_file
+2. derive bytes/sec and tweets/sec per file (over its own time_total) and
+   for the whole run (over the wall clock, so parallel workers add up)
+3. write them as <prefix>.csv (one row per file) and <prefix>.json (run summary)
+
+@author: chenzhong
+"""
+
+import os
+import json
+import time
+import pandas as pd
+
+COUNTERS = ['lines', 'malformed', 'prefilter', 'prefilter_missed', 'bad_json',
+            'no_id', 'no_user', 'no_coordinates', 'no_place', 'kept',
+            'kept_without_coordinates', 'bytes_in', 'bytes_out']
+TIMINGS = ['time_decompress', 'time_decode', 'time_build', 'time_total']
+
+
+def _rates(row, total):
+    # throughput of one row of counters over total seconds, 0 when nothing
+    # was timed
+    if total <= 0:
+        return 0.0, 0.0, 0.0
+    return row['bytes_in'] / total, row['bytes_out'] / total, row['lines'] / total
+
+
+class IngestReport(object):
+
+    def __init__(self):
+        self.started = time.time()
+        self.rows = []
+
+    def add(self, filename, counts):
+        row = dict((key, counts.get(key, 0)) for key in COUNTERS + TIMINGS)
+        row['file'] = filename
+        row['bytes_in_per_s'], row['bytes_out_per_s'], row['tweets_per_s'] = \
+            _rates(row, row['time_total'])
+        self.rows.append(row)
+
+    def frame(self):
+        columns = ['file'] + COUNTERS + TIMINGS + ['bytes_in_per_s', 'bytes_out_per_s',
+                                                  'tweets_per_s']
+        return pd.DataFrame(self.rows, columns=columns)
+
+    def summary(self):
+        df = self.frame()
+        wall = time.time() - self.started
+        totals = dict((key, float(df[key].sum())) for key in COUNTERS + TIMINGS)
+        # time_total is summed over files read side by side by the workers, so
+        # the run's rates are taken over the wall clock
+        totals['bytes_in_per_s'], totals['bytes_out_per_s'], totals['tweets_per_s'] = \
+            _rates(totals, wall)
+        return {
+            'started': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self.started)),
+            'wall_seconds': wall,
+            'files': len(df),
+            'totals': totals,
+        }
+
+    def write(self, prefix):
+        self.frame().to_csv(prefix + '.csv', encoding='utf-8', header=True, index=False)
+        with open(prefix + '.json', 'w') as f:
+            json.dump(self.summary(), f, indent=2, sort_keys=True)
+
+    def print_summary(self):
+        summary = self.summary()
+        totals = summary['totals']
+        print("%d files, %d lines, %d kept in %.1f s, %.1f MB/s in, %.0f tweets/s"
+              % (len(self.rows), totals['lines'], totals['kept'], summary['wall_seconds'],
+                 totals['bytes_in_per_s'] / 1e6, totals['tweets_per_s']))
+
+
+def report_prefix(root):
+    # root + 'ingest_report_YYYYmmdd_HHMMSS'
+    return os.path.join(root, time.strftime('ingest_report_%Y%m%d_%H%M%S'))
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 21:58:30 2026
+
+bulk load of the ingest's month csv files (directory + '.csv', see
+filtergeo_kenya.py) into the yearly tweet tables (tweets_kenya_14 ...)
+
+functions provide
+1. one table per year (or per month) indexed on (userid, created_at)
+2. executemany inserts in one transaction per month file, tweets whose id
+   is already in the table skipped, so a month can be loaded again
+3. the same against a local sqlite file, to try it without the server
+
+usage: python load_tweets.py [--prefix tweets_kenya] [--by year|month]
+                             [--sqlite FILE | --host H --user U --password P --database D]
+                             2014-06.csv 2014-07.csv ...
+
+@author: chenzhong
+"""
+
+import argparse
+
+import tweet_db
+
+
+def connect(args):
+    if args.sqlite:
+        import sqlite3
+        return tweet_db.ConnectionPool(sqlite3, database=args.sqlite)
+    import mysql.connector
+    return tweet_db.ConnectionPool(mysql.connector, user=args.user, password=args.password,
+                                   host=args.host, database=args.database, charset='utf8mb4')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='bulk load month csv files into tweet tables')
+    parser.add_argument('files', nargs='+')
+    parser.add_argument('--prefix', default='tweets_kenya')
+    parser.add_argument('--by', default='year', choices=['year', 'month'])
+    parser.add_argument('--chunksize', type=int, default=tweet_db.LOAD_CHUNK)
+    parser.add_argument('--sqlite')
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--user', default='root')
+    parser.add_argument('--password', default='')
+    parser.add_argument('--database', default='kenya_tw')
+    args = parser.parse_args(argv)
+
+    pool = connect(args)
+    try:
+        tweet_db.load_files(pool, sorted(args.files), args.prefix, args.by, args.chunksize)
+    finally:
+        pool.close()
+
+
+if __name__ == '__main__':
+    main()
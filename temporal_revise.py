@@ -1,45 +1,27 @@
-#!/usr/bin/env python2
+#!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 """
 Created on Sun May 27 00:33:58 2018
 
+migrate the legacy month csv files of a folder into the typed tweet store:
+fixed column names, epoch timestamps, bounded chunks, several files at a
+time (see tweet_store.py)
+
 @author: chenzhong
 """
 
-import os
-import pandas as pd
-import datetime
-
-from datetime import datetime
-import time
-
-def to_datetime(datestring):
-    if pd.isnull(datestring):
-        return ''
-    elif len(str(datestring))<30:
-        return ''
-    else:
-        return time.strftime('%Y-%m-%d %H:%M:%S', time.strptime(str(datestring),'%a %b %d %H:%M:%S +0000 %Y'))
+import tweet_store
 
+directory = '/Volumes/FREESPACE/workspace/python/twitter_analysis/data/tweet-extractor-london'
+store = '/Volumes/FREESPACE/workspace/python/twitter_analysis/data/tweet-store'
+region = 'london'
 
-directory = '/Volumes/FREESPACE/workspace/python/twitter_analysis/data/tweet-extractor-london' 
-for filename in os.listdir(directory):
-    if filename.endswith(".csv"): 
-       #print(os.path.join(directory, filename))
-       #filename = "/Volumes/FREESPACE/workspace/python/twitter_analysis/2017-06/json_2017-06-13-20.txt.gz"
-       print("we move on to another file!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!! number %s %s" %(filecount, filename))
-       filename = directory + '/'+filename
-       tw_id = "haha"
-       df = pd.read_csv(filename, encoding='utf-8')
-       c = df.time.apply(lambda x: to_datetime(x))
-       df.time = pd.to_datetime(c)
+# files migrated at the same time, and rows of a file held in memory at once
+workers = 4
+chunksize = 500000
 
-       cols = df.columns
-       for col in cols[2:-1]:
-           df[col] = df[col].astype(str)
-           
-       df = df[df.location <> 'None']
-       colnames = ['id', 'text', 'userid', 'lat', 'lon', 'created_at', 'location']
-       df.columns = colnames
-       csvname = filename + '.csv'  
-       df.to_csv(csvname, sep = ',',encoding='utf-8', header = True, index = False)
+# the worker processes import this file again (spawn on mac), so the run
+# only starts from the main one
+if __name__ == '__main__':
+    report = tweet_store.migrate_folder(directory, store, region, workers, chunksize)
+    report.to_csv(store + '/migrate_' + region + '.csv', header=True, index=False)
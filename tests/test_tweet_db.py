@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+
+import sqlite3
+
+import tweet_db
+
+
+class NamedSqlite(object):
+    # sqlite3 as a driver with the named paramstyle
+    paramstyle = 'named'
+    DatabaseError = sqlite3.DatabaseError
+
+    connect = staticmethod(sqlite3.connect)
+
+
+def _pool(tmpdir):
+    name = str(tmpdir.join('tweets.db'))
+    cnx = sqlite3.connect(name)
+    cnx.execute('CREATE TABLE t (userid INTEGER, x TEXT)')
+    cnx.executemany('INSERT INTO t VALUES (?, ?)', [(1, 'a'), (2, 'b'), (2, 'c')])
+    cnx.commit()
+    cnx.close()
+    return tweet_db.ConnectionPool(NamedSqlite(), database=name)
+
+
+def test_named_paramstyle_positional_params_hit_the_cache(tmpdir, monkeypatch):
+    pool = _pool(tmpdir)
+    cache = tweet_db.QueryCache(str(tmpdir.join('cache')))
+    sql = 'SELECT x FROM t WHERE userid = :p0'
+    first = tweet_db.read_sql(pool, sql, [2], cache)
+    assert sorted(first['x']) == ['b', 'c']
+
+    def no_query(*args, **kwargs):
+        raise AssertionError('read_sql went to the database')
+    monkeypatch.setattr(pool, 'connection', no_query)
+    assert sorted(tweet_db.read_sql(pool, sql, [2], cache)['x']) == ['b', 'c']
+
+
+def test_named_params_are_part_of_the_cache_key(tmpdir):
+    pool = _pool(tmpdir)
+    cache = tweet_db.QueryCache(str(tmpdir.join('cache')))
+    sql = 'SELECT x FROM t WHERE userid = :u'
+    assert list(tweet_db.read_sql(pool, sql, {'u': 1}, cache)['x']) == ['a']
+    assert sorted(tweet_db.read_sql(pool, sql, {'u': 2}, cache)['x']) == ['b', 'c']
@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+
+import tweet_mobility
+from tweet_trajectory import TrajectoryIndex
+
+
+def test_stay_centroids_leave_out_runs_between_stays():
+    # two London stays with a short run far away between them
+    lon = np.array([-0.1, -0.1, -0.1, 20.0, -0.12, -0.12, -0.12])
+    lat = np.array([51.5, 51.5, 51.5, 68.0, 51.52, 51.52, 51.52])
+    time = np.array([0, 900, 1800, 2000, 3000, 4000, 5000])
+    index = TrajectoryIndex.build(np.ones(len(lon), dtype=np.int64), time, lon=lon, lat=lat)
+
+    stays = tweet_mobility.stay_points(index)
+
+    assert list(stays['points']) == [3, 3]
+    assert np.allclose(stays['lon'], [-0.1, -0.12])
+    assert np.allclose(stays['lat'], [51.5, 51.52])
+    assert list(stays['arrival']) == [0, 3000]
+    assert list(stays['departure']) == [1800, 5000]
+
+
+def test_no_stays():
+    index = TrajectoryIndex.build(np.ones(2, dtype=np.int64), np.array([0, 10]),
+                                  lon=np.array([-0.1, -0.1]), lat=np.array([51.5, 51.5]))
+    assert len(tweet_mobility.stay_points(index)) == 0
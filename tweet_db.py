@@ -0,0 +1,454 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 21:24:40 2026
+
+batched tweet retrieval from the SQL tables (kenya_tw.tweets_kenya_14 ...)
+for any DB-API module: mysql.connector, MySQLdb, sqlite3 ...
+
+functions provide
+1. a small connection pool, so a script opens one connection and reuses it
+   instead of connecting for every query
+2. the tweets of many users in one statement per chunk of users:
+   parameterized userid IN (...) lists, the yearly tables joined with
+   UNION ALL, instead of a string-built query per user and table
+3. every chunk read with fetchall and the frames concatenated once
+4. a local cache of query results (parquet files keyed by the normalized
+   sql and its parameters) with a time to live, least recently used
+   eviction past a size limit and invalidation by table
+5. bulk load of the ingest's month csv files into yearly or monthly tweet
+   tables indexed on (userid, created_at): executemany in one transaction
+   per file, ids already in the table skipped
+
+@author: chenzhong
+"""
+
+import os
+import re
+import json
+import time
+import hashlib
+from contextlib import contextmanager
+import numpy as np
+import pandas as pd
+
+import tweet_ingest
+import tweet_store
+
+# users per statement; with four tables that is 4 * CHUNK parameters, under
+# the 999 of older sqlite builds
+CHUNK = 200
+
+IDENTIFIER = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*(\.[A-Za-z_][A-Za-z0-9_]*)?$')
+
+# quoted strings and the tables a statement reads or writes
+QUOTED = re.compile(r"('(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|`[^`]*`)")
+TABLES = re.compile(r'\b(?:from|join|into|update|table)\s+`?([A-Za-z_][\w.`]*)', re.IGNORECASE)
+
+# rows read from a month csv and inserted at a time when loading
+LOAD_CHUNK = 100000
+
+# tweet table of the loader, in sql that mysql and sqlite both take; lat and
+# lon are text as in the csv, so "lat <> ''" keeps working, created_at is a
+# DATETIME loaded from the csv's 'YYYY-mm-dd HH:MM:SS' (NULL when missing)
+TWEET_TABLE = ('CREATE TABLE %s (id BIGINT PRIMARY KEY, text TEXT, userid BIGINT, '
+               'lat VARCHAR(32), lon VARCHAR(32), created_at DATETIME, location VARCHAR(255))')
+TWEET_INDEX = 'CREATE INDEX %s ON %s (userid, created_at)'
+
+# query cache defaults: a week, 2 GB
+CACHE_TTL = 7 * 24 * 3600
+CACHE_BYTES = 2 * 1024 ** 3
+
+
+class ConnectionPool(object):
+    # connections of one DB-API module opened with the same arguments, at
+    # most size of them, handed out and taken back by connection()
+
+    def __init__(self, module, size=1, **connect_args):
+        self.module = module
+        self.size = size
+        self.connect_args = connect_args
+        self.idle = []
+        self.opened = 0
+
+    @property
+    def paramstyle(self):
+        return self.module.paramstyle
+
+    @contextmanager
+    def connection(self):
+        if self.idle:
+            cnx = self.idle.pop()
+        elif self.opened < self.size:
+            cnx = self.module.connect(**self.connect_args)
+            self.opened += 1
+        else:
+            raise RuntimeError("all %d connections are in use" % self.size)
+        try:
+            yield cnx
+        except Exception:
+            self._discard(cnx)
+            raise
+        else:
+            self.idle.append(cnx)
+
+    def _discard(self, cnx):
+        self.opened -= 1
+        try:
+            cnx.close()
+        except Exception:
+            pass
+
+    def close(self):
+        while self.idle:
+            self._discard(self.idle.pop())
+
+
+def placeholders(paramstyle, n, start=0):
+    # n parameter markers of a DB-API paramstyle
+    if paramstyle == 'qmark':
+        return ['?'] * n
+    if paramstyle in ('format', 'pyformat'):
+        return ['%s'] * n
+    if paramstyle == 'numeric':
+        return [':%d' % (start + i + 1) for i in range(n)]
+    if paramstyle == 'named':
+        return [':p%d' % (start + i) for i in range(n)]
+    raise ValueError("unknown paramstyle %s" % paramstyle)
+
+
+def _python(value):
+    # DB-API drivers take python ints, not numpy ones
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def _params(paramstyle, values):
+    # positional values for the markers of placeholders()
+    values = [_python(v) for v in values]
+    if paramstyle == 'named':
+        return dict(('p%d' % i, v) for i, v in enumerate(values))
+    return values
+
+
+def _query_params(paramstyle, params):
+    # parameters of a query given by the caller: a dict for named or
+    # pyformat markers, passed through as it is, or a list / tuple of
+    # positional values
+    if params is None:
+        return None
+    if isinstance(params, dict):
+        return dict((name, _python(v)) for name, v in params.items())
+    if isinstance(params, (list, tuple)):
+        return _params(paramstyle, params)
+    raise TypeError("query parameters must be a dict, list or tuple, not %s"
+                    % type(params).__name__)
+
+
+def _identifier(name):
+    # table and column names cannot be parameters, so they are checked
+    if not IDENTIFIER.match(name):
+        raise ValueError("not a table or column name: %r" % name)
+    return name
+
+
+def users_query(paramstyle, tables, n, columns='*', where=None, key='userid'):
+    # one statement for n users over tables, UNION ALL of a select per table;
+    # the parameters are the user ids repeated once per table
+    cols = columns if columns == '*' else ', '.join(_identifier(c) for c in columns)
+    selects = []
+    for k, table in enumerate(tables):
+        marks = placeholders(paramstyle, n, k * n)
+        sql = 'SELECT %s FROM %s WHERE %s IN (%s)' % (cols, _identifier(table), _identifier(key),
+                                                      ', '.join(marks))
+        if where:
+            sql += ' AND (%s)' % where
+        selects.append(sql)
+    return ' UNION ALL '.join(selects)
+
+
+def fetch_users(pool, tables, userids, columns='*', where=None, key='userid', chunk=CHUNK):
+    # tweets of userids from every table as one frame, chunk users per
+    # statement on one pooled connection; where is a fixed sql condition
+    # such as "lat <> ''"
+    userids = list(pd.unique(np.asarray(userids)))
+    frames = []
+    names = None
+    with pool.connection() as cnx:
+        cursor = cnx.cursor()
+        try:
+            for i in range(0, len(userids), chunk):
+                ids = userids[i:i + chunk]
+                sql = users_query(pool.paramstyle, tables, len(ids), columns, where, key)
+                cursor.execute(sql, _params(pool.paramstyle, ids * len(tables)))
+                rows = cursor.fetchall()
+                names = [d[0] for d in cursor.description]
+                frames.append(pd.DataFrame.from_records(rows, columns=names))
+        finally:
+            cursor.close()
+    if not frames:
+        return pd.DataFrame(columns=None if columns == '*' else list(columns))
+    return pd.concat(frames, ignore_index=True)
+
+
+def normalize_sql(sql):
+    # lower case, single spaces and no trailing ';' outside quoted strings,
+    # so the same query written twice gets the same cache key
+    parts = QUOTED.split(sql.strip().rstrip(';').strip())
+    for i in range(0, len(parts), 2):
+        parts[i] = re.sub(r'\s+', ' ', parts[i].lower())
+    return ''.join(parts).strip()
+
+
+def tables_of(sql):
+    # table names a statement mentions, lower case, without the database
+    names = set()
+    for name in TABLES.findall(QUOTED.sub("''", sql)):
+        names.add(name.replace('`', '').lower().split('.')[-1])
+    return sorted(names)
+
+
+class QueryCache(object):
+    # <folder>/<key>.parquet per result and <folder>/index.json with the sql,
+    # tables, size, creation and last use of every entry
+
+    def __init__(self, folder, ttl=CACHE_TTL, max_bytes=CACHE_BYTES):
+        self.folder = folder
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        if not os.path.exists(folder):
+            os.makedirs(folder)
+        self.index_name = os.path.join(folder, 'index.json')
+        self.entries = {}
+        if os.path.exists(self.index_name):
+            with open(self.index_name) as f:
+                self.entries = json.load(f)
+
+    def key(self, sql, params=None):
+        # named parameters as sorted (name, value) pairs, so the values are
+        # part of the key and not only the names
+        params = _query_params('qmark', params) or None
+        if isinstance(params, dict):
+            params = {'named': sorted(params.items())}
+        text = normalize_sql(sql) + '\0' + json.dumps(params, sort_keys=True, default=str)
+        return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.folder, key + '.parquet')
+
+    def _save(self):
+        tmp = self.index_name + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(self.entries, f, indent=1, sort_keys=True)
+        os.rename(tmp, self.index_name)
+
+    def _drop(self, key):
+        self.entries.pop(key, None)
+        if os.path.exists(self._path(key)):
+            os.remove(self._path(key))
+
+    def get(self, sql, params=None):
+        # cached frame of a query, None when missing or older than ttl
+        key = self.key(sql, params)
+        entry = self.entries.get(key)
+        if entry is None or not os.path.exists(self._path(key)):
+            return None
+        if self.ttl is not None and time.time() - entry['created'] > self.ttl:
+            self._drop(key)
+            self._save()
+            return None
+        df = pd.read_parquet(self._path(key))
+        entry['used'] = time.time()
+        self._save()
+        return df
+
+    def put(self, sql, params, df):
+        key = self.key(sql, params)
+        tmp = self._path(key) + '.tmp'
+        df.to_parquet(tmp, compression='zstd', index=False)
+        os.rename(tmp, self._path(key))
+        now = time.time()
+        self.entries[key] = {'sql': normalize_sql(sql), 'tables': tables_of(sql), 'created': now,
+                             'used': now, 'bytes': os.path.getsize(self._path(key))}
+        self._evict()
+        self._save()
+
+    def _evict(self):
+        # least recently used entries out until the cache fits max_bytes
+        total = sum(e['bytes'] for e in self.entries.values())
+        for key in sorted(self.entries, key=lambda k: self.entries[k]['used']):
+            if self.max_bytes is None or total <= self.max_bytes:
+                break
+            total -= self.entries[key]['bytes']
+            self._drop(key)
+
+    def invalidate(self, table=None):
+        # entries reading table (with or without its database), all of them
+        # when table is None; returns how many went
+        name = table.lower().split('.')[-1] if table else None
+        keys = [k for k, e in self.entries.items() if name is None or name in e['tables']]
+        for key in keys:
+            self._drop(key)
+        self._save()
+        return len(keys)
+
+
+def read_sql(pool, sql, params=None, cache=None):
+    # result of a query as a frame, from cache when it has it; params is a
+    # dict for named markers (:u, %(u)s) or a list / tuple for positional ones
+    if cache is not None:
+        df = cache.get(sql, params)
+        if df is not None:
+            return df
+    with pool.connection() as cnx:
+        cursor = cnx.cursor()
+        try:
+            # the cache keys on the caller's params, the driver gets them in
+            # its paramstyle
+            values = _query_params(pool.paramstyle, params)
+            if values:
+                cursor.execute(sql, values)
+            else:
+                cursor.execute(sql)
+            rows = cursor.fetchall()
+            names = [d[0] for d in cursor.description]
+        finally:
+            cursor.close()
+    df = pd.DataFrame.from_records(rows, columns=names)
+    if cache is not None:
+        cache.put(sql, params, df)
+    return df
+
+
+def partition_table(prefix, month, by='year'):
+    # tweets_kenya, '2014-06' -> tweets_kenya_14 (by year, as the existing
+    # tables) or tweets_kenya_2014_06 (by month)
+    year, m = month.split('-')
+    if by == 'year':
+        return '%s_%s' % (prefix, year[2:])
+    if by == 'month':
+        return '%s_%s_%s' % (prefix, year, m)
+    raise ValueError("unknown partitioning %s" % by)
+
+
+def index_name(table):
+    # kenya_tw.tweets_kenya_14 -> tweets_kenya_14_user_time
+    return table.split('.')[-1] + '_user_time'
+
+
+def create_index(cnx, module, table):
+    # sqlite puts the database on the index name, mysql on the table
+    if module.__name__ == 'sqlite3' and '.' in table:
+        schema, name = table.split('.')
+        sql = TWEET_INDEX % (schema + '.' + index_name(table), name)
+    else:
+        sql = TWEET_INDEX % (index_name(table), table)
+    cursor = cnx.cursor()
+    try:
+        cursor.execute(sql)
+        cnx.commit()
+    finally:
+        cursor.close()
+
+
+def has_index(cnx, module, table):
+    # whether table has its (userid, created_at) index, from sqlite_master
+    # on sqlite and SHOW INDEX on mysql
+    cursor = cnx.cursor()
+    try:
+        if module.__name__ == 'sqlite3':
+            schema = table.split('.')[0] + '.' if '.' in table else ''
+            cursor.execute("SELECT name FROM %ssqlite_master WHERE type = 'index' AND name = ?"
+                           % schema, (index_name(table),))
+        else:
+            marks = placeholders(module.paramstyle, 1)
+            cursor.execute('SHOW INDEX FROM %s WHERE Key_name = %s' % (table, marks[0]),
+                           _params(module.paramstyle, [index_name(table)]))
+        return len(cursor.fetchall()) > 0
+    finally:
+        cursor.close()
+
+
+def ensure_table(cnx, module, table, index=True):
+    # create table unless it exists and, when index is set, its
+    # (userid, created_at) index unless that exists; True when the table
+    # was created
+    _identifier(table)
+    cursor = cnx.cursor()
+    try:
+        try:
+            cursor.execute('SELECT 1 FROM %s WHERE 1 = 0' % table)
+            cursor.fetchall()
+            created = False
+        except module.DatabaseError:
+            cnx.rollback()
+            cursor.execute(TWEET_TABLE % table)
+            cnx.commit()
+            created = True
+    finally:
+        cursor.close()
+    if index and not has_index(cnx, module, table):
+        create_index(cnx, module, table)
+    return created
+
+
+def _existing_ids(cursor, paramstyle, table, ids):
+    # the ids of a chunk already in table, looked up over the chunk's range
+    # through the primary key; tweet ids grow with time and the month files
+    # are in time order, so that range is narrow
+    lo, hi = placeholders(paramstyle, 2)
+    cursor.execute('SELECT id FROM %s WHERE id BETWEEN %s AND %s' % (table, lo, hi),
+                   _params(paramstyle, [ids.min(), ids.max()]))
+    return np.array([row[0] for row in cursor.fetchall()], dtype=np.int64)
+
+
+def _rows(df):
+    # rows of a store-typed chunk in the csv layout, NaT times as NULL
+    out = tweet_ingest.to_legacy_frame(df)
+    out['created_at'] = out['created_at'].where(out['created_at'] != 'NaT', None)
+    out['userid'] = df.loc[out.index, 'userid']
+    columns = [out[c].values.astype(object) for c in tweet_ingest.COLUMNS]
+    return list(zip(*columns))
+
+
+def load_csv(pool, filename, prefix, by='year', chunksize=LOAD_CHUNK):
+    # one month csv of the ingest (YYYY-MM.csv) into its partition table,
+    # chunksize rows per executemany and one commit at the end; the index
+    # of the table is built after the file is in when it is missing (a new
+    # table, or one whose first load failed)
+    table = partition_table(prefix, tweet_store.month_of(filename), by)
+    sql = 'INSERT INTO %s (%s) VALUES (%s)' % (
+        _identifier(table), ', '.join(tweet_ingest.COLUMNS),
+        ', '.join(placeholders(pool.paramstyle, len(tweet_ingest.COLUMNS))))
+    read = inserted = 0
+    with pool.connection() as cnx:
+        ensure_table(cnx, pool.module, table, index=False)
+        cursor = cnx.cursor()
+        try:
+            for chunk in pd.read_csv(filename, encoding='utf-8', dtype=str,
+                                     keep_default_na=False, chunksize=chunksize):
+                read += len(chunk)
+                df = tweet_store.fix_legacy(chunk).drop_duplicates('id')
+                if not len(df):
+                    continue
+                ids = df['id'].values
+                df = df[~np.isin(ids, _existing_ids(cursor, pool.paramstyle, table, ids))]
+                if len(df):
+                    cursor.executemany(sql, _rows(df))
+                    inserted += len(df)
+            cnx.commit()
+        except Exception:
+            cnx.rollback()
+            raise
+        finally:
+            cursor.close()
+        if not has_index(cnx, pool.module, table):
+            create_index(cnx, pool.module, table)
+    return {'file': filename, 'table': table, 'rows_read': read, 'rows_inserted': inserted}
+
+
+def load_files(pool, filenames, prefix, by='year', chunksize=LOAD_CHUNK):
+    # load_csv over month files, with a report of rows per file
+    report = pd.DataFrame([load_csv(pool, f, prefix, by, chunksize) for f in filenames],
+                          columns=['file', 'table', 'rows_read', 'rows_inserted'])
+    print(report.to_string(index=False))
+    return report
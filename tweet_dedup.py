@@ -0,0 +1,121 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 12:40:19 2026
+
+tweet id index used to drop the tweets the collector wrote more than once
+(hour boundaries, restarts)
+
+functions provide
+1. a compact id index: a sorted int64 array (8 bytes per id) plus a small
+   sorted delta that is merged in once it grows, so adding an hourly batch
+   does not copy the whole index
+2. save / load the index between incremental runs, with the byte range of
+   every month csv it already covers
+
+@author: chenzhong
+"""
+
+import os
+import io
+import json
+import numpy as np
+import pandas as pd
+
+# the delta is merged into the main array when it passes this share of it
+MERGE_RATIO = 0.125
+MIN_MERGE = 1 << 20
+
+
+def _in_sorted(a, ids):
+    # mask of ids present in the sorted array a
+    if len(a) == 0:
+        return np.zeros(len(ids), dtype=bool)
+    pos = np.searchsorted(a, ids)
+    pos[pos == len(a)] = len(a) - 1
+    return a[pos] == ids
+
+
+def _merge(a, b):
+    # two sorted unique arrays without common values -> one sorted array
+    if len(b) == 0:
+        return a
+    return np.insert(a, np.searchsorted(a, b), b)
+
+
+class IdIndex(object):
+
+    def __init__(self, ids=None):
+        self.main = np.unique(np.asarray(ids if ids is not None else [], dtype=np.int64))
+        self.delta = np.empty(0, dtype=np.int64)
+        # csv name -> end of the byte range whose ids are in the index
+        self.covered = {}
+
+    def __len__(self):
+        return len(self.main) + len(self.delta)
+
+    def contains(self, ids):
+        ids = np.asarray(ids, dtype=np.int64)
+        return _in_sorted(self.main, ids) | _in_sorted(self.delta, ids)
+
+    def add(self, ids):
+        # mask of the ids seen for the first time, a repeat inside ids
+        # counts as a duplicate of its first occurrence
+        ids = np.asarray(ids, dtype=np.int64)
+        uniq, first = np.unique(ids, return_index=True)
+        new = ~self.contains(uniq)
+        keep = np.zeros(len(ids), dtype=bool)
+        keep[first[new]] = True
+        self.delta = _merge(self.delta, uniq[new])
+        if len(self.delta) > max(MIN_MERGE, MERGE_RATIO * len(self.main)):
+            self.compact()
+        return keep
+
+    def discard(self, ids):
+        ids = np.unique(np.asarray(ids, dtype=np.int64))
+        self.compact()
+        self.main = self.main[~_in_sorted(ids, self.main)]
+
+    def compact(self):
+        self.main = _merge(self.main, self.delta)
+        self.delta = np.empty(0, dtype=np.int64)
+
+    def save(self, filename):
+        self.compact()
+        tmp = filename + '.tmp.npy'
+        np.save(tmp, self.main)
+        os.rename(tmp, filename)
+        with open(covered_name(filename), 'w') as f:
+            json.dump(self.covered, f)
+
+    @classmethod
+    def load(cls, filename):
+        index = cls()
+        if os.path.exists(filename):
+            index.main = np.load(filename)
+            with open(covered_name(filename)) as f:
+                index.covered = json.load(f)
+        return index
+
+
+def covered_name(filename):
+    return os.path.splitext(filename)[0] + '.json'
+
+
+def csv_ids(csvname, start, end):
+    # tweet ids of the month csv rows stored between two byte offsets
+    if end <= start:
+        return np.empty(0, dtype=np.int64)
+    with open(csvname, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+    rows = pd.read_csv(io.BytesIO(data), header=None, usecols=[0], encoding='utf-8')
+    return rows[0].values.astype(np.int64)
+
+
+def drop_duplicates(batch, index, counts, key='duplicates'):
+    # rows of batch whose id the index has not seen yet, the rest is
+    # counted in counts[key]
+    keep = index.add(batch['id'].values)
+    counts[key] += int(len(keep) - keep.sum())
+    return batch[keep].reset_index(drop=True)
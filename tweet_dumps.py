@@ -0,0 +1,136 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 14:10:44 2026
+
+synthetic hourly dumps in the collector's format, for measuring the ingest
+without the real tweet-extractor archive
+
+functions provide
+1. make realistic tweet json (user, place with bounding box, entities,
+   now and then a geotagged retweet inside a non-geotagged tweet)
+2. write json_YYYY-MM-DD-HH.txt.gz files of 'id<TAB>json' lines with a
+   chosen volume, geotag ratio, null place ratio, malformed lines and
+   repeated ids
+
+usage: python tweet_dumps.py <directory> <number of tweets> [tweets per file]
+
+@author: chenzhong
+"""
+
+import os
+import sys
+import gzip
+import json
+import time
+import calendar
+import random
+
+# London box, as in getTrajectory.py
+LAT = (51.2, 51.8)
+LON = (-0.7, 0.4)
+
+PLACES = ['London', 'Camden Town', 'Islington', 'Hackney', 'Westminster',
+          'Southwark', 'Lambeth', 'Croydon', 'Greenwich', 'Richmond']
+
+WORDS = ('the a to of and in is on for at with london today tube rain coffee '
+         'weekend work football music love night good new time day city').split()
+
+TWITTER_TIME_FORMAT = '%a %b %d %H:%M:%S +0000 %Y'
+
+
+def make_place(rng, name):
+    lat = rng.uniform(*LAT)
+    lon = rng.uniform(*LON)
+    box = [[lon - 0.05, lat - 0.03], [lon + 0.05, lat - 0.03],
+           [lon + 0.05, lat + 0.03], [lon - 0.05, lat + 0.03]]
+    return {'id': '%016x' % rng.getrandbits(64), 'url': 'https://api.twitter.com/1.1/geo/id.json',
+            'place_type': 'city', 'name': name, 'full_name': name + ', London',
+            'country_code': 'GB', 'country': 'United Kingdom',
+            'bounding_box': {'type': 'Polygon', 'coordinates': [box]}, 'attributes': {}}
+
+
+def make_user(rng, userid):
+    return {'id': userid, 'id_str': str(userid), 'name': 'user %d' % userid,
+            'screen_name': 'user%d' % userid, 'location': 'London, England',
+            'description': ' '.join(rng.choice(WORDS) for _ in range(12)),
+            'followers_count': rng.randint(0, 5000), 'friends_count': rng.randint(0, 2000),
+            'statuses_count': rng.randint(0, 50000), 'lang': 'en', 'geo_enabled': True,
+            'created_at': 'Mon Mar 02 10:11:12 +0000 2012', 'verified': False,
+            'profile_image_url': 'http://pbs.twimg.com/profile_images/%d/a_normal.jpg' % userid}
+
+
+def make_tweet(rng, tweetid, epoch, user, place, geotagged):
+    text = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(5, 20)))
+    tw = {'created_at': time.strftime(TWITTER_TIME_FORMAT, time.gmtime(epoch)),
+          'id': tweetid, 'id_str': str(tweetid), 'text': text,
+          'source': '<a href="http://twitter.com/download/iphone">Twitter for iPhone</a>',
+          'truncated': False, 'in_reply_to_status_id': None, 'user': user,
+          'geo': None, 'coordinates': None, 'place': place,
+          'retweet_count': 0, 'favorite_count': 0, 'lang': 'en',
+          'entities': {'hashtags': [], 'urls': [], 'user_mentions': [], 'symbols': []},
+          'timestamp_ms': str(epoch * 1000)}
+    if geotagged:
+        lat = rng.uniform(*LAT)
+        lon = rng.uniform(*LON)
+        tw['coordinates'] = {'type': 'Point', 'coordinates': [lon, lat]}
+        tw['geo'] = {'type': 'Point', 'coordinates': [lat, lon]}
+    elif rng.random() < 0.01:
+        # geotagged retweet inside a non-geotagged tweet, the case the raw
+        # prefilter lets through to the full decoder
+        inner = dict(tw)
+        inner['coordinates'] = {'type': 'Point', 'coordinates': [LON[0], LAT[0]]}
+        tw['retweeted_status'] = inner
+    return tw
+
+
+def write_dumps(directory, n_tweets, tweets_per_file=10000, start='2017-06-01',
+                geotag_ratio=0.3, null_place_ratio=0.5, malformed_ratio=0.001,
+                duplicate_ratio=0.01, users=50000, seed=0, compresslevel=6):
+    # writes ceil(n_tweets / tweets_per_file) hourly files from start on
+    # and returns their names
+    rng = random.Random(seed)
+    if not os.path.exists(directory):
+        os.makedirs(directory)
+    t0 = calendar.timegm(time.strptime(start, '%Y-%m-%d'))
+    user_cache = {}
+    places = [make_place(rng, name) for name in PLACES]
+    recent = []
+    filenames = []
+    tweetid = 800000000000000000
+    written = 0
+    hour = 0
+    while written < n_tweets:
+        epoch = t0 + hour * 3600
+        filename = os.path.join(directory, time.strftime('json_%Y-%m-%d-%H.txt.gz',
+                                                         time.gmtime(epoch)))
+        n = min(tweets_per_file, n_tweets - written)
+        with gzip.open(filename, 'wb', compresslevel) as f:
+            for i in range(n):
+                if rng.random() < malformed_ratio:
+                    f.write(b'broken line without a tab\n')
+                    continue
+                if recent and rng.random() < duplicate_ratio:
+                    # the collector overlapping an hour or restarting
+                    f.write(rng.choice(recent))
+                    continue
+                tweetid += rng.randint(1, 1000)
+                userid = rng.randint(1, users)
+                if userid not in user_cache:
+                    user_cache[userid] = make_user(rng, userid)
+                place = None if rng.random() < null_place_ratio else rng.choice(places)
+                tw = make_tweet(rng, tweetid, epoch + i * 3600 // n, user_cache[userid],
+                                place, rng.random() < geotag_ratio)
+                line = ('%d\t%s\n' % (tweetid, json.dumps(tw))).encode('utf-8')
+                f.write(line)
+                recent = (recent + [line])[-1000:] if i % 97 == 0 else recent
+        written += n
+        hour += 1
+        filenames.append(filename)
+    return filenames
+
+
+if __name__ == '__main__':
+    per_file = int(sys.argv[3]) if len(sys.argv) > 3 else 10000
+    files = write_dumps(sys.argv[1], int(sys.argv[2]), per_file)
+    print("%d files written to %s" % (len(files), sys.argv[1]))
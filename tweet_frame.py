@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 16:25:10 2026
+
+compact in-memory tweet frame shared by the analysis scripts
+
+functions provide
+1. enforce the tweet schema: int64 id/userid, float64 (or float32) lat/lon,
+   int64 epoch created_at, categorical location, compact text
+2. load tweets with that schema from the store or from a legacy csv export
+   (e.g. tw_15_17.csv), in chunks
+3. integer user ids from the '123', '123.0' strings of the user exports,
+   without the rstrip('.0') that also ate trailing zeros
+
+@author: chenzhong
+"""
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+import tweet_time
+import tweet_store
+from tweet_ingest import COLUMNS
+
+
+def text_dtype():
+    # arrow-backed strings when pandas has them, one buffer instead of a
+    # python object per tweet
+    try:
+        pd.Series([''], dtype='string[pyarrow]')
+        return 'string[pyarrow]'
+    except (TypeError, ImportError, ValueError):
+        return object
+
+
+def as_int64(values):
+    # user/tweet ids -> int64; ints stay as they are, strings are parsed as
+    # integers so no digit is lost
+    values = pd.Series(values)
+    if values.dtype == np.int64:
+        return values
+    ids, valid = tweet_store.parse_ids(values.values)
+    if not valid.all():
+        raise ValueError("%d ids are not integers" % (~valid).sum())
+    return pd.Series(ids, index=values.index)
+
+
+def as_epoch(values):
+    # int64 epoch or datetime64 come through tweet_time.epoch_seconds, time
+    # strings through the store parser
+    values = np.asarray(values)
+    if values.dtype == np.int64 or values.dtype.kind == 'M':
+        return tweet_time.epoch_seconds(values)
+    return tweet_store.parse_times(values)
+
+
+def as_tweet_frame(df, coords=np.float64):
+    # enforce the tweet schema on the columns df has; created_at may come in
+    # as datetime64 or epoch and leaves as int64 epoch seconds
+    out = pd.DataFrame(index=df.index)
+    for col in df.columns:
+        values = df[col]
+        if col in ('id', 'userid'):
+            values = as_int64(values)
+        elif col in ('lat', 'lon'):
+            values = pd.to_numeric(values, errors='coerce').astype(coords)
+        elif col == 'created_at':
+            values = pd.Series(as_epoch(values.values), index=df.index)
+        elif col == 'location':
+            values = values.astype('category')
+        elif col == 'text':
+            values = values.astype(text_dtype())
+        out[col] = values
+    return out
+
+
+def load(store, region, period, columns=None, coords=np.float64):
+    # store partitions of a period (see tweet_store.load) as a tweet frame
+    return as_tweet_frame(tweet_store.load(store, region, period, columns), coords)
+
+
+def read_csv(filename, coords=np.float64, chunksize=tweet_store.CHUNKSIZE):
+    # legacy csv export -> tweet frame, chunk by chunk so the object-dtype
+    # copy of the whole file never exists; malformed lines are skipped with
+    # a warning, as error_bad_lines=False did
+    chunks = []
+    for chunk in pd.read_csv(filename, encoding='utf-8', dtype=str, keep_default_na=False,
+                             on_bad_lines='warn', chunksize=chunksize):
+        chunks.append(as_tweet_frame(tweet_store.fix_legacy(chunk), coords))
+    if not chunks:
+        return as_tweet_frame(pd.DataFrame(columns=COLUMNS), coords)
+    location = union_categoricals([c['location'] for c in chunks])
+    df = pd.concat([c.drop(columns='location') for c in chunks], ignore_index=True)
+    df['location'] = pd.Categorical(location)
+    return df[COLUMNS]
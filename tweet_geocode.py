@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 17:05:48 2026
+
+point-in-polygon assignment of tweets to MSOA / ward / borough
+
+functions provide
+1. build the tweet points from the lat/lon arrays in one call
+2. query a prepared STRtree of each boundary layer for the whole batch,
+   instead of tw.apply(make_point) and gpd.sjoin(..., op='within')
+3. return one area-code array per layer, several layers sharing the points
+   and an optional outer boundary (london_boundary.shp) applied once
+4. a grid lookup table per layer: cells entirely inside one polygon map
+   straight to its code, only boundary cells fall back to the exact test;
+   saved next to the shapefile and rebuilt when the shapefile changes
+
+@author: chenzhong
+"""
+
+import os
+import math
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+import shapely
+from shapely import STRtree
+
+WGS84 = 'EPSG:4326'
+
+# metres per degree of latitude
+METRES_PER_DEGREE = 111320.0
+
+# grid table values besides polygon indexes
+OUTSIDE = -1
+BOUNDARY = -2
+
+
+class AreaLayer(object):
+    # polygons of one boundary file with the code column to hand out
+
+    def __init__(self, gdf, code, name=None):
+        if gdf.crs is not None and not gdf.crs.equals(WGS84):
+            gdf = gdf.to_crs(WGS84)
+        self.name = name or code
+        self.codes = gdf[code].values
+        self.geometry = np.asarray(gdf.geometry.values, dtype=object)
+        shapely.prepare(self.geometry)
+        self.tree = STRtree(self.geometry)
+        self.bounds = gdf.total_bounds
+        self.grid = None
+
+    def locate(self, pts):
+        # polygon index of every point, -1 outside all of them; a point on a
+        # shared border goes to the polygon listed first, like sjoin's first row
+        found = np.full(len(pts), -1, dtype=np.int64)
+        pt, poly = self.tree.query(pts, predicate='within')
+        if len(pt):
+            order = np.lexsort((poly, pt))
+            pt, poly = pt[order], poly[order]
+            first = np.r_[True, pt[1:] != pt[:-1]]
+            found[pt[first]] = poly[first]
+        return found
+
+    def codes_of(self, found):
+        out = np.full(len(found), None, dtype=object)
+        inside = found >= 0
+        out[inside] = self.codes[found[inside]]
+        return out
+
+
+class GridLookup(object):
+    # regular lon/lat grid over a layer, cell_size metres on a side; every
+    # cell holds the polygon index it lies in, OUTSIDE, or BOUNDARY when it
+    # touches several polygons or an edge and needs the exact test
+
+    def __init__(self, layer, table, origin, step, shape):
+        self.layer = layer
+        self.table = table
+        self.origin = origin
+        self.step = step
+        self.shape = shape
+
+    @classmethod
+    def build(cls, layer, cell_size=100):
+        x0, y0, x1, y1 = layer.bounds
+        dy = cell_size / METRES_PER_DEGREE
+        dx = dy / math.cos(math.radians((y0 + y1) / 2))
+        nx = int(math.ceil((x1 - x0) / dx))
+        ny = int(math.ceil((y1 - y0) / dy))
+        X, Y = np.meshgrid(x0 + np.arange(nx) * dx, y0 + np.arange(ny) * dy)
+        X, Y = X.ravel(), Y.ravel()
+        cells = shapely.box(X, Y, X + dx, Y + dy)
+
+        table = np.full(len(cells), OUTSIDE, dtype=np.int32)
+        cell, poly = layer.tree.query(cells, predicate='intersects')
+        hits = np.bincount(cell, minlength=len(cells))
+        table[hits > 0] = BOUNDARY
+        single = hits[cell] == 1
+        cell, poly = cell[single], poly[single]
+        inside = shapely.within(cells[cell], layer.geometry[poly])
+        table[cell[inside]] = poly[inside]
+        return cls(layer, table, (x0, y0), (dx, dy), (ny, nx))
+
+    def locate(self, lon, lat):
+        lon = np.asarray(lon, dtype=np.float64)
+        lat = np.asarray(lat, dtype=np.float64)
+        with np.errstate(invalid='ignore'):
+            i = np.floor((lon - self.origin[0]) / self.step[0])
+            j = np.floor((lat - self.origin[1]) / self.step[1])
+        ok = (i >= 0) & (i < self.shape[1]) & (j >= 0) & (j < self.shape[0])
+        found = np.full(len(lon), OUTSIDE, dtype=np.int64)
+        found[ok] = self.table[j[ok].astype(np.int64) * self.shape[1] + i[ok].astype(np.int64)]
+        edge = np.flatnonzero(found == BOUNDARY)
+        if len(edge):
+            found[edge] = self.layer.locate(make_points(lon[edge], lat[edge]))
+        return found
+
+    def save(self, filename, signature):
+        np.savez_compressed(filename, table=self.table, origin=self.origin, step=self.step,
+                            shape=self.shape, signature=signature)
+
+    @classmethod
+    def load(cls, filename, layer, signature):
+        # None when the file is missing or was built from another shapefile
+        if not os.path.exists(filename):
+            return None
+        data = np.load(filename)
+        if str(data['signature']) != signature:
+            return None
+        return cls(layer, data['table'], tuple(data['origin']), tuple(data['step']),
+                   tuple(int(n) for n in data['shape']))
+
+
+def shapefile_signature(filename, code, cell_size):
+    # size and mtime of the shapefile parts the grid depends on
+    base = os.path.splitext(filename)[0]
+    parts = []
+    for ext in ['.shp', '.dbf', '.prj']:
+        if os.path.exists(base + ext):
+            st = os.stat(base + ext)
+            parts.append('%s:%d:%d' % (ext, st.st_size, int(st.st_mtime)))
+    return '|'.join(parts + [code, str(cell_size)])
+
+
+def grid_name(filename, code, cell_size):
+    # london_msoa.shp -> london_msoa.MSOA11CD.100m.grid.npz
+    return '%s.%s.%dm.grid.npz' % (os.path.splitext(filename)[0], code, cell_size)
+
+
+def read_layer(filename, code, name=None, cell_size=None):
+    # with cell_size, the layer answers through a grid lookup kept next to
+    # the shapefile and rebuilt when the shapefile changes
+    layer = AreaLayer(gpd.read_file(filename), code, name)
+    if cell_size:
+        cache = grid_name(filename, code, cell_size)
+        signature = shapefile_signature(filename, code, cell_size)
+        layer.grid = GridLookup.load(cache, layer, signature)
+        if layer.grid is None:
+            layer.grid = GridLookup.build(layer, cell_size)
+            layer.grid.save(cache, signature)
+    return layer
+
+
+def make_points(lon, lat):
+    # shapely points for whole arrays, no per-row Point()
+    return shapely.points(np.asarray(lon, dtype=np.float64), np.asarray(lat, dtype=np.float64))
+
+
+def _in_bounds(lon, lat, bounds):
+    return (lon >= bounds[0]) & (lon <= bounds[2]) & (lat >= bounds[1]) & (lat <= bounds[3])
+
+
+def assign_areas(lon, lat, layers, boundary=None):
+    # DataFrame with one code column per layer (None where a tweet is in no
+    # polygon); with a boundary layer, tweets outside it get None everywhere,
+    # as the sjoin against london_boundary then london_msoa did
+    lon = np.asarray(lon, dtype=np.float64)
+    lat = np.asarray(lat, dtype=np.float64)
+    candidate = np.isfinite(lon) & np.isfinite(lat)
+    if boundary is not None:
+        candidate &= _in_bounds(lon, lat, boundary.bounds)
+    idx = np.flatnonzero(candidate)
+    # points are built once and only if a layer without a grid needs them
+    pts = {}
+
+    def locate(layer, sel):
+        if layer.grid is not None:
+            return layer.grid.locate(lon[idx[sel]], lat[idx[sel]])
+        if 'all' not in pts:
+            pts['all'] = make_points(lon[idx], lat[idx])
+        return layer.locate(pts['all'][sel])
+
+    if boundary is not None:
+        keep = locate(boundary, np.ones(len(idx), dtype=bool)) >= 0
+        idx = idx[keep]
+        if 'all' in pts:
+            pts['all'] = pts['all'][keep]
+    out = pd.DataFrame(index=np.arange(len(lon)))
+    for layer in layers:
+        inside = _in_bounds(lon[idx], lat[idx], layer.bounds)
+        found = np.full(len(lon), -1, dtype=np.int64)
+        found[idx[inside]] = locate(layer, inside)
+        out[layer.name] = layer.codes_of(found)
+    return out
@@ -0,0 +1,450 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 09:12:40 2026
+
+ingest engine shared by filtergeo_london.py and filtergeo_kenya.py
+
+functions provide
+1. decode every 'id<TAB>json' line of an hourly .gz dump once into
+   typed per-column buffers
+2. flush the buffers as one DataFrame batch per file
+3. build the month frame and write it in the legacy directory + '.csv' layout
+4. shard the hourly files of one or many months over a process pool
+5. route every decoded tweet to each region whose bounding box holds it,
+   so several cities cost one decode of the archive
+6. optionally ("geotagged only") drop lines without a coordinates object
+   before json decoding, counting the lines rejected at every stage
+7. stream the gzip members in fixed-size buffers, so memory stays flat
+   however big the hour, optionally decompressing on a separate thread
+8. optionally drop tweets whose id was already seen (see tweet_dedup.py)
+9. count and time every stage per file (see ingest_stats.py)
+
+@author: chenzhong
+"""
+
+import os
+import re
+import zlib
+import json
+import threading
+from collections import namedtuple, Counter
+from functools import partial
+from multiprocessing import Pool
+from timeit import default_timer as timer
+try:
+    from queue import Queue
+except ImportError:
+    from Queue import Queue
+import pandas as pd
+import numpy as np
+
+import tweet_time
+from tweet_dedup import drop_duplicates
+
+COLUMNS = ['id', 'text', 'userid', 'lat', 'lon', 'created_at', 'location']
+
+# lat/lon are (min, max) pairs, root is the folder the month csv goes to
+Region = namedtuple('Region', ['name', 'lat', 'lon', 'root'])
+
+# a geotagged tweet has "coordinates": {"type": "Point", ...}; a line with no
+# such object anywhere cannot be one, so it is rejected without decoding
+GEOTAGGED = re.compile(br'"coordinates"\s*:\s*\{')
+
+# bytes read from and decompressed out of a dump at a time
+BUFFER_SIZE = 1 << 20
+
+
+class TweetBuffer(object):
+    # one list per output column, appended while decoding and turned into
+    # typed arrays (int64 ids, float64 coordinates, int64 epoch) on flush
+
+    def __init__(self):
+        self.clear()
+        self.reset_counts()
+
+    def clear(self):
+        self.id = []
+        self.text = []
+        self.userid = []
+        self.lat = []
+        self.lon = []
+        self.created_at = []
+        self.location = []
+        # point used for region routing: the tweet coordinates, or the
+        # centre of the place bounding box for tweets without them
+        self.route_lat = []
+        self.route_lon = []
+
+    def reset_counts(self):
+        self.counts = Counter()
+
+    def __len__(self):
+        return len(self.id)
+
+    def append(self, tw, geotagged_only=False):
+        reason = reject_reason(tw, geotagged_only)
+        if reason is not None:
+            self.counts[reason] += 1
+            return False
+        self.counts['kept'] += 1
+        place = tw['place']
+        coordinates = tw.get('coordinates')
+        if coordinates is None:
+            self.counts['kept_without_coordinates'] += 1
+            lon, lat = np.nan, np.nan
+            route_lon, route_lat = place_centre(place)
+        else:
+            lon, lat = coordinates['coordinates'][:2]
+            route_lon, route_lat = lon, lat
+        self.id.append(tw['id'])
+        self.userid.append(tw['user']['id'])
+        self.lat.append(lat)
+        self.lon.append(lon)
+        self.created_at.append(tw.get('created_at'))
+        self.text.append(tw.get('text'))
+        self.location.append(place['name'])
+        self.route_lat.append(route_lat)
+        self.route_lon.append(route_lon)
+        return True
+
+    def flush(self):
+        batch = pd.DataFrame({
+            'id': np.array(self.id, dtype=np.int64),
+            'text': np.array(self.text, dtype=object),
+            'userid': np.array(self.userid, dtype=np.int64),
+            'lat': np.array(self.lat, dtype=np.float64),
+            'lon': np.array(self.lon, dtype=np.float64),
+            'created_at': tweet_time.to_epoch(self.created_at),
+            'location': np.array(self.location, dtype=object),
+        }, columns=COLUMNS)
+        self.clear()
+        return batch
+
+    def flush_routed(self, regions):
+        # one batch per region name, a tweet goes to every region it is in
+        lat = np.array(self.route_lat, dtype=np.float64)
+        lon = np.array(self.route_lon, dtype=np.float64)
+        batch = self.flush()
+        routed = {}
+        for region in regions:
+            inside = ((lat >= region.lat[0]) & (lat <= region.lat[1]) &
+                      (lon >= region.lon[0]) & (lon <= region.lon[1]))
+            routed[region.name] = batch[inside].reset_index(drop=True)
+        return routed
+
+
+def reject_reason(tw, geotagged_only=False):
+    # rules of the old loop: a tweet needs an id, a user and a non-null
+    # place; coordinates may be missing unless geotagged_only
+    if 'id' not in tw:
+        return 'no_id'
+    if 'user' not in tw:
+        return 'no_user'
+    if geotagged_only and tw.get('coordinates') is None:
+        return 'no_coordinates'
+    if tw.get('place') is None:
+        return 'no_place'
+    return None
+
+
+def place_centre(place):
+    # (lon, lat) centre of a place bounding box, nan when there is none
+    box = place.get('bounding_box')
+    if not box or not box.get('coordinates'):
+        return np.nan, np.nan
+    corners = np.array(box['coordinates'][0], dtype=np.float64)
+    centre = (corners.min(axis=0) + corners.max(axis=0)) / 2
+    return centre[0], centre[1]
+
+
+def iter_chunks(filename, buffer_size=BUFFER_SIZE, counts=None):
+    # decompressed pieces of at most buffer_size bytes; a new gzip member
+    # starts where the previous one left unused data, and a truncated file
+    # simply ends with what could be decompressed.
+    # counts gets bytes_in/bytes_out and the time spent reading and inflating
+    if counts is None:
+        counts = Counter()
+    d = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    with open(filename, 'rb') as f:
+        t = timer()
+        raw = f.read(buffer_size)
+        counts['bytes_in'] += len(raw)
+        while raw:
+            try:
+                chunk = d.decompress(raw, buffer_size)
+            except zlib.error:
+                # trailing garbage or padding after the last member
+                counts['time_decompress'] += timer() - t
+                return
+            counts['bytes_out'] += len(chunk)
+            counts['time_decompress'] += timer() - t
+            if chunk:
+                yield chunk
+            t = timer()
+            if d.unused_data:
+                # checked first, zlib leaves it in unconsumed_tail as well
+                raw = d.unused_data
+                d = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            elif d.unconsumed_tail:
+                raw = d.unconsumed_tail
+            else:
+                raw = f.read(buffer_size)
+                counts['bytes_in'] += len(raw)
+        chunk = d.flush()
+        counts['bytes_out'] += len(chunk)
+        counts['time_decompress'] += timer() - t
+        if chunk:
+            yield chunk
+
+
+def threaded_chunks(chunks, depth=4):
+    # run the decompression on its own thread, at most depth chunks ahead
+    queue = Queue(maxsize=depth)
+    done = object()
+
+    def produce():
+        try:
+            for chunk in chunks:
+                queue.put(chunk)
+        except Exception as e:
+            queue.put(e)
+        queue.put(done)
+
+    worker = threading.Thread(target=produce)
+    worker.daemon = True
+    worker.start()
+    while True:
+        chunk = queue.get()
+        if chunk is done:
+            break
+        if isinstance(chunk, Exception):
+            raise chunk
+        yield chunk
+
+
+def iter_lines(filename, buffer_size=BUFFER_SIZE, threaded=False, counts=None):
+    # 'id\tjson' records of one hourly dump, read lazily; a truncated final
+    # line is still handed out and left to the json decoder
+    chunks = iter_chunks(filename, buffer_size, counts)
+    if threaded:
+        chunks = threaded_chunks(chunks)
+    pending = b''
+    for chunk in chunks:
+        lines = (pending + chunk).split(b'\n')
+        pending = lines.pop()
+        for line in lines:
+            yield line
+    if pending:
+        yield pending
+
+
+def decode(raw):
+    # json bytes -> tweet dict, None when the collector wrote it badly
+    try:
+        return json.loads(raw.decode('utf-8'))
+    except ValueError:
+        return None
+
+
+def read_file(filename, buf=None, regions=None, geotagged_only=False,
+              check_prefilter=False, threaded=False):
+    # decode one hourly dump and return its rows as a typed batch, or a
+    # dict of region name -> batch when regions are given; buf.counts holds
+    # the number of lines seen and rejected at every stage, the bytes read
+    # and the seconds spent inflating, decoding json and building rows
+    #
+    # check_prefilter decodes the lines the raw scan rejected anyway and
+    # counts as 'prefilter_missed' any that would have been kept
+    if buf is None:
+        buf = TweetBuffer()
+    buf.reset_counts()
+    counts = buf.counts
+    if check_prefilter:
+        counts['prefilter_missed'] = 0
+    start = timer()
+    for line in iter_lines(filename, threaded=threaded, counts=counts):
+        counts['lines'] += 1
+        tw_content = line.split(b'\t')
+        if len(tw_content) < 2:
+            counts['malformed'] += 1
+            continue
+        raw = tw_content[1]
+        if geotagged_only and GEOTAGGED.search(raw) is None:
+            counts['prefilter'] += 1
+            if check_prefilter:
+                tw = decode(raw)
+                if tw is not None and reject_reason(tw, True) is None:
+                    counts['prefilter_missed'] += 1
+            continue
+        t = timer()
+        tw = decode(raw)
+        t_decoded = timer()
+        counts['time_decode'] += t_decoded - t
+        if tw is None:
+            counts['bad_json'] += 1
+            continue
+        buf.append(tw, geotagged_only)
+        counts['time_build'] += timer() - t_decoded
+    t = timer()
+    if regions is not None:
+        batch = buf.flush_routed(regions)
+    else:
+        batch = buf.flush()
+    end = timer()
+    counts['time_build'] += end - t
+    counts['time_total'] += end - start
+    return batch
+
+
+def list_files(directory):
+    # hourly dumps in name order, so json_YYYY-MM-DD-HH sorts by time
+    return [os.path.join(directory, filename)
+            for filename in sorted(os.listdir(directory))
+            if filename.endswith('.gz')]
+
+
+def empty_frame():
+    return TweetBuffer().flush()
+
+
+def _concat(batches):
+    if not batches:
+        return empty_frame()
+    return pd.concat(batches, ignore_index=True)
+
+
+def read_counted(filename, **options):
+    buf = TweetBuffer()
+    return read_file(filename, buf, **options), buf.counts
+
+
+def _iter_results(filenames, workers, read):
+    if workers <= 1 or len(filenames) <= 1:
+        for filename in filenames:
+            yield read(filename)
+        return
+    pool = Pool(min(workers, len(filenames)))
+    try:
+        for result in pool.imap(read, filenames, chunksize=1):
+            yield result
+    finally:
+        pool.close()
+        pool.join()
+
+
+def iter_batches(filenames, workers=1, report=None, **options):
+    # (batch, counts) per file, in the order of filenames whatever the
+    # worker count, so the merged output is identical to a single-worker run;
+    # report (an ingest_stats.IngestReport) gets the counts of every file
+    results = _iter_results(filenames, workers, partial(read_counted, **options))
+    for filename, (batch, counts) in zip(filenames, results):
+        if report is not None:
+            report.add(filename, counts)
+        yield batch, counts
+
+
+def _take_month(results, month):
+    counts = Counter()
+    batches = []
+    for _ in month:
+        batch, file_counts = next(results)
+        batches.append(batch)
+        counts.update(file_counts)
+    return batches, counts
+
+
+def ingest_month(directory, workers=1, stats=None, dedup=None, **options):
+    # dedup is an IdIndex; batches are checked against it in file order
+    results = iter_batches(list_files(directory), workers, **options)
+    batches = []
+    if stats is None:
+        stats = Counter()
+    for batch, counts in results:
+        stats.update(counts)
+        if dedup is not None:
+            batch = drop_duplicates(batch, dedup, stats)
+        batches.append(batch)
+    return _concat(batches)
+
+
+def ingest_months(directories, workers=1, dedup=None, **options):
+    # one pool over the hourly files of every month; (directory, frame,
+    # counts) is yielded as soon as the last file of a month is in
+    files = [list_files(directory) for directory in directories]
+    results = iter_batches([f for month in files for f in month], workers, **options)
+    for directory, month in zip(directories, files):
+        batches, counts = _take_month(results, month)
+        if dedup is not None:
+            batches = [drop_duplicates(batch, dedup, counts) for batch in batches]
+        yield directory, _concat(batches), counts
+
+
+def route_months(directories, regions, workers=1, dedup=None, **options):
+    # same as ingest_months but over a mixed archive, yielding
+    # (directory, {region name: month frame}, counts); dedup holds one
+    # IdIndex per region name
+    files = [list_files(directory) for directory in directories]
+    results = iter_batches([f for month in files for f in month], workers,
+                           regions=regions, **options)
+    for directory, month in zip(directories, files):
+        routed, counts = _take_month(results, month)
+        frames = {}
+        for region in regions:
+            batches = [r[region.name] for r in routed]
+            if dedup is not None:
+                batches = [drop_duplicates(batch, dedup[region.name], counts,
+                                           region.name + '_duplicates')
+                           for batch in batches]
+            frames[region.name] = _concat(batches)
+        yield directory, frames, counts
+
+
+def report_counts(counts):
+    # lines rejected at each stage, the raw scan first
+    stages = ['lines', 'malformed', 'prefilter', 'prefilter_missed', 'bad_json',
+              'no_id', 'no_user', 'no_coordinates', 'no_place', 'kept',
+              'kept_without_coordinates']
+    stages += sorted(stage for stage in counts if stage.endswith('duplicates'))
+    print(' '.join('%s=%d' % (stage, counts[stage]) for stage in stages
+                   if stage in counts or stage in ('lines', 'kept')))
+
+
+def to_legacy_frame(df):
+    # string layout of the old output: userid/lat/lon/created_at as str,
+    # missing coordinates as '' and unparsable times as 'NaT'
+    out = pd.DataFrame(columns=COLUMNS)
+    out['id'] = df['id']
+    out['text'] = df['text']
+    out['userid'] = df['userid'].astype(str)
+    for col in ['lat', 'lon']:
+        values = df[col].astype(object)
+        values[df[col].isnull()] = ''
+        out[col] = values.astype(str)
+    t = df['created_at'].values.view('datetime64[s]')
+    out['created_at'] = pd.Series(t, index=df.index).dt.strftime('%Y-%m-%d %H:%M:%S').fillna('NaT')
+    out['location'] = df['location']
+    return out[out.location != 'None']
+
+
+def write_legacy_csv(df, csvname):
+    to_legacy_frame(df).to_csv(csvname, sep=',', encoding='utf-8', header=True, index=False)
+
+
+def filter_months(directories, workers=1, dedup=None, **options):
+    for directory, df, counts in ingest_months(directories, workers, dedup, **options):
+        print("%s count of tweet %d" % (directory, len(df)))
+        report_counts(counts)
+        write_legacy_csv(df, directory + '.csv')
+
+
+def filter_regions(directories, regions, workers=1, dedup=None, **options):
+    # region.root + month + '.csv' for every region, one decode per tweet
+    for directory, frames, counts in route_months(directories, regions, workers,
+                                                  dedup, **options):
+        name = os.path.basename(os.path.normpath(directory))
+        report_counts(counts)
+        for region in regions:
+            df = frames[region.name]
+            print("%s %s count of tweet %d" % (name, region.name, len(df)))
+            write_legacy_csv(df, os.path.join(region.root, name + '.csv'))
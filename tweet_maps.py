@@ -0,0 +1,130 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 18:20:05 2026
+
+batch trajectory maps, one png per user over the borough basemap
+
+functions provide
+1. rasterize the borough basemap once into an image array, instead of
+   london.plot(...) for every user figure
+2. draw a user's points coloured by time over that image, reusing one
+   figure per process and only moving the points between users
+3. spread a user list of any length over a process pool, the points of
+   the users coming from a tweet_trajectory.TrajectoryIndex
+
+@author: chenzhong
+"""
+
+import os
+from functools import partial
+from multiprocessing import Pool
+import numpy as np
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+from matplotlib.colors import Normalize
+
+import tweet_time
+
+# London, as in getTrajectory.py: lon min, lon max, lat min, lat max
+EXTENT = (-0.7, 0.4, 51.2, 51.8)
+FIGSIZE = (10, 8)
+DPI = 100
+
+# users sent to a worker at a time
+CHUNK = 50
+
+# figure of the current process, set up by _init
+_figure = {}
+
+
+def _axes(figsize, dpi, extent):
+    fig = plt.figure(figsize=figsize, dpi=dpi)
+    ax = fig.add_axes([0, 0, 1, 1])
+    ax.set_axis_off()
+    ax.set_xlim(extent[0], extent[1])
+    ax.set_ylim(extent[2], extent[3])
+    return fig, ax
+
+
+def rasterize(gdf, extent=EXTENT, figsize=FIGSIZE, dpi=DPI):
+    # RGBA image of the polygons over extent, drawn as getTrajectory.py did
+    fig, ax = _axes(figsize, dpi, extent)
+    gdf.plot(ax=ax, color='lightgrey', linewidth=0.5, edgecolor='white')
+    ax.set_aspect('auto')
+    ax.set_xlim(extent[0], extent[1])
+    ax.set_ylim(extent[2], extent[3])
+    fig.canvas.draw()
+    image = np.asarray(fig.canvas.buffer_rgba()).copy()
+    plt.close(fig)
+    return image
+
+
+def _init(basemap, folder, norm, extent=EXTENT, figsize=FIGSIZE, dpi=DPI,
+          cmap='jet', markersize=10):
+    # one figure per process: the basemap image and an empty scatter whose
+    # points and colours are replaced for every user
+    fig, ax = _axes(figsize, dpi, extent)
+    ax.imshow(basemap, extent=extent, aspect='auto', interpolation='nearest')
+    ax.set_xlim(extent[0], extent[1])
+    ax.set_ylim(extent[2], extent[3])
+    points = ax.scatter(np.zeros(0), np.zeros(0), c=np.zeros(0), s=markersize,
+                        cmap=cmap, norm=Normalize(*norm))
+    _figure.update(fig=fig, points=points, folder=folder, dpi=dpi)
+
+
+def _render(chunk):
+    # chunk: list of (userid, lon, lat, time); returns the files written
+    fig, points = _figure['fig'], _figure['points']
+    written = []
+    for userid, lon, lat, time in chunk:
+        points.set_offsets(np.column_stack([lon, lat]))
+        points.set_array(np.asarray(time, dtype=np.float64))
+        filename = os.path.join(_figure['folder'], '%d.png' % userid)
+        fig.savefig(filename, dpi=_figure['dpi'])
+        written.append(filename)
+    return written
+
+
+def _chunks(index, chunk):
+    # (userid, lon, lat, time) of every user of index, chunk users at a time
+    batch = []
+    for userid, points in index:
+        batch.append((int(userid), np.asarray(points['lon']), np.asarray(points['lat']),
+                      np.asarray(points['time'])))
+        if len(batch) == chunk:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def render_users(index, users, basemap, folder='fig', workers=1, norm=None,
+                 chunk=CHUNK, **options):
+    # <folder>/<userid>.png for every user of users found in index (a
+    # tweet_trajectory.TrajectoryIndex with lon, lat and time); norm is the
+    # (min, max) time of the colour scale, all of the index (but NaT) by
+    # default
+    if not os.path.exists(folder):
+        os.makedirs(folder)
+    if norm is None:
+        time = np.asarray(index.columns['time'])
+        time = time[time != tweet_time.NAT]
+        norm = (float(time.min()), float(time.max()))
+    selected = index.take(users)
+    written = []
+    if workers <= 1:
+        _init(basemap, folder, norm, **options)
+        for batch in _chunks(selected, chunk):
+            written.extend(_render(batch))
+        plt.close(_figure['fig'])
+        return written
+    pool = Pool(workers, partial(_init, **options), (basemap, folder, norm))
+    try:
+        for files in pool.imap(_render, _chunks(selected, chunk)):
+            written.extend(files)
+    finally:
+        pool.close()
+        pool.join()
+    return written
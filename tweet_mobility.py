@@ -0,0 +1,207 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 18:52:36 2026
+
+mobility metrics of every user at once, over the time-sorted arrays of a
+tweet_trajectory.TrajectoryIndex
+
+functions provide
+1. stay points: runs of consecutive tweets within a distance of the run's
+   first tweet and lasting at least a time threshold
+2. radius of gyration, total and median displacement between consecutive
+   tweets, one row per user
+3. distinct areas (e.g. MSOA) visited by every user in every quarter
+
+all of them work on whole arrays with a segment id per point (bincount,
+lexsort, reduceat), no python loop over users. Points with a NaT time, and
+for the distance metrics points without finite lon/lat (place-only
+tweets), are left out
+
+@author: chenzhong
+"""
+
+import numpy as np
+import pandas as pd
+
+from tweet_time import NAT
+
+EARTH_RADIUS = 6371008.8  # metres
+
+# stay point thresholds
+STAY_DISTANCE = 200  # metres
+STAY_TIME = 20 * 60  # seconds
+
+
+def haversine(lon1, lat1, lon2, lat2):
+    # great-circle distance in metres, element-wise
+    lon1, lat1, lon2, lat2 = [np.radians(np.asarray(v, dtype=np.float64))
+                              for v in (lon1, lat1, lon2, lat2)]
+    a = np.sin((lat2 - lat1) / 2) ** 2 + \
+        np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def valid_points(index, coords=True):
+    # the index without the points whose time is NaT or, with coords, whose
+    # lon/lat is not finite; the index itself when every point is valid
+    keep = np.asarray(index.columns['time'], dtype=np.int64) != NAT
+    if coords:
+        keep &= np.isfinite(index.columns['lon']) & np.isfinite(index.columns['lat'])
+    return index if keep.all() else index.where(keep)
+
+
+def segments(index):
+    # user position (0..len(index)-1) of every point of the index
+    return np.repeat(np.arange(len(index.users), dtype=np.int64), index.counts())
+
+
+def segment_median(values, seg, n):
+    # median of values within each of n segments, nan for empty ones
+    order = np.lexsort((values, seg))
+    values = values[order]
+    counts = np.bincount(seg, minlength=n)
+    starts = np.r_[0, np.cumsum(counts)[:-1]]
+    out = np.full(n, np.nan)
+    full = counts > 0
+    lo = starts[full] + (counts[full] - 1) // 2
+    hi = starts[full] + counts[full] // 2
+    out[full] = (values[lo] + values[hi]) / 2.0
+    return out
+
+
+def steps(index):
+    # distance and time between consecutive points of the same user, with
+    # the user position of each step
+    index = valid_points(index)
+    lon, lat, time = index.columns['lon'], index.columns['lat'], index.columns['time']
+    seg = segments(index)
+    same = seg[1:] == seg[:-1]
+    dist = haversine(lon[:-1], lat[:-1], lon[1:], lat[1:])[same]
+    dt = (np.asarray(time[1:], dtype=np.int64) - np.asarray(time[:-1], dtype=np.int64))[same]
+    return seg[:-1][same], dist, dt
+
+
+def radius_of_gyration(index):
+    # root mean square distance of every user's points from their centre
+    index = valid_points(index)
+    lon, lat = index.columns['lon'], index.columns['lat']
+    seg = segments(index)
+    counts = index.counts().astype(np.float64)
+    n = len(index.users)
+    centre_lon = np.bincount(seg, weights=lon, minlength=n) / counts
+    centre_lat = np.bincount(seg, weights=lat, minlength=n) / counts
+    d = haversine(lon, lat, centre_lon[seg], centre_lat[seg])
+    return np.sqrt(np.bincount(seg, weights=d ** 2, minlength=n) / counts)
+
+
+def _run_starts(index, distance):
+    # first point of every run: a run goes on while its points stay within
+    # distance of its first point. A step longer than 2 * distance always
+    # starts a run; the remaining splits are found a round at a time, each
+    # round looking only at the runs split in the round before
+    lon, lat = index.columns['lon'], index.columns['lat']
+    seg = segments(index)
+    start = np.zeros(len(seg), dtype=bool)
+    start[index.offsets[:-1][index.counts() > 0]] = True
+    step = haversine(lon[:-1], lat[:-1], lon[1:], lat[1:])
+    start[1:] |= step > 2 * distance
+    active = np.ones(len(seg), dtype=bool)
+    while active.any():
+        run = np.cumsum(start) - 1
+        anchor = np.flatnonzero(start)[run]
+        idx = np.flatnonzero(active)
+        far = idx[haversine(lon[anchor[idx]], lat[anchor[idx]], lon[idx], lat[idx]) > distance]
+        if not len(far):
+            break
+        # the first far point of each run starts a new run
+        first = np.r_[True, run[far[1:]] != run[far[:-1]]]
+        split = far[first]
+        start[split] = True
+        # points from a split onwards, to the end of the old run
+        run_end = np.r_[np.flatnonzero(start)[1:], len(seg)]
+        new_run = np.cumsum(start) - 1
+        bounds = np.column_stack([split, run_end[new_run[split]]])
+        marks = np.zeros(len(seg) + 1, dtype=np.int64)
+        np.add.at(marks, bounds[:, 0], 1)
+        np.add.at(marks, bounds[:, 1], -1)
+        active = np.cumsum(marks[:-1]) > 0
+    return start
+
+
+def stay_points(index, distance=STAY_DISTANCE, duration=STAY_TIME):
+    # one row per stay: userid, mean lon/lat, arrival, departure and number
+    # of tweets of the run
+    index = valid_points(index)
+    lon, lat, time = index.columns['lon'], index.columns['lat'], index.columns['time']
+    columns = ['userid', 'lon', 'lat', 'arrival', 'departure', 'points']
+    if not len(lon):
+        return pd.DataFrame(columns=columns)
+    start = _run_starts(index, distance)
+    first = np.flatnonzero(start)
+    last = np.r_[first[1:], len(lon)] - 1
+    time = np.asarray(time, dtype=np.int64)
+    stay = time[last] - time[first] >= duration
+    # sums over every run, before the short runs between stays are dropped
+    lon_sum = np.add.reduceat(lon, first)[stay]
+    lat_sum = np.add.reduceat(lat, first)[stay]
+    first, last = first[stay], last[stay]
+    points = last - first + 1
+    return pd.DataFrame({
+        'userid': index.users[segments(index)[first]],
+        'lon': lon_sum / points,
+        'lat': lat_sum / points,
+        'arrival': time[first],
+        'departure': time[last],
+        'points': points,
+    }, columns=columns)
+
+
+def user_metrics(index, distance=STAY_DISTANCE, duration=STAY_TIME):
+    # one row per user: points, radius of gyration, total and median
+    # displacement (metres) and number of stay points of the users with
+    # valid points
+    index = valid_points(index)
+    n = len(index.users)
+    seg, dist, dt = steps(index)
+    stays = stay_points(index, distance, duration)
+    stay_user = np.searchsorted(index.users, stays['userid'].values)
+    return pd.DataFrame({
+        'userid': index.users,
+        'points': index.counts(),
+        'radius_of_gyration': radius_of_gyration(index),
+        'total_displacement': np.bincount(seg, weights=dist, minlength=n),
+        'median_displacement': segment_median(dist, seg, n),
+        'stay_points': np.bincount(stay_user, minlength=n),
+    }, columns=['userid', 'points', 'radius_of_gyration', 'total_displacement',
+                'median_displacement', 'stay_points'])
+
+
+def quarters_of(epoch):
+    # epoch seconds (no NaT) -> year * 4 + quarter - 1
+    t = np.asarray(epoch, dtype=np.int64).view('datetime64[s]')
+    months = t.astype('datetime64[M]').astype(np.int64)  # months since 1970-01
+    return (1970 * 4 + months // 3).astype(np.int64)
+
+
+def areas_per_quarter(index, area='area'):
+    # one row per user and quarter: number of distinct areas visited, from
+    # an integer area column of the index (negative for no area)
+    index = valid_points(index, coords=False)
+    codes = np.asarray(index.columns[area], dtype=np.int64)
+    quarter = quarters_of(index.columns['time'])
+    seg = segments(index)
+    keep = codes >= 0
+    seg, quarter, codes = seg[keep], quarter[keep], codes[keep]
+    q0 = quarter.min() if len(quarter) else 0
+    nq = quarter.max() - q0 + 1 if len(quarter) else 1
+    na = codes.max() + 1 if len(codes) else 1
+    visits = np.unique((seg * nq + (quarter - q0)) * na + codes)
+    user_quarter, counts = np.unique(visits // na, return_counts=True)
+    quarters, q = np.unique(user_quarter % nq + q0, return_inverse=True)
+    labels = np.array(['%d-Q%d' % (x // 4, x % 4 + 1) for x in quarters], dtype=object)
+    return pd.DataFrame({
+        'userid': index.users[user_quarter // nq],
+        'quarter': labels[q],
+        'areas': counts,
+    }, columns=['userid', 'quarter', 'areas'])
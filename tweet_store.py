@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 15:20:37 2026
+
+typed tweet store, one compressed parquet file per region and month
+(<store>/<region>/<YYYY-MM>.parquet)
+
+functions provide
+1. fix the column names, types and timestamps of legacy tweet csv files
+2. migrate legacy month csv files into the store in bounded chunks, several
+   files in parallel, with a report of rows per file
+3. write the months of the ingest straight into the store
+4. load a time range ('2016-Q3', '2015-08..2016-01', '2016') and a column
+   list, reading only the matching partitions and columns
+
+@author: chenzhong
+"""
+
+import os
+import re
+from functools import partial
+from multiprocessing import Pool
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+import tweet_time
+import tweet_ingest
+from tweet_ingest import COLUMNS
+
+SCHEMA = pa.schema([
+    ('id', pa.int64()),
+    ('text', pa.string()),
+    ('userid', pa.int64()),
+    ('lat', pa.float64()),
+    ('lon', pa.float64()),
+    ('created_at', pa.int64()),  # epoch seconds, see tweet_time.py
+    ('location', pa.string()),
+])
+
+COMPRESSION = 'zstd'
+
+# rows read from a legacy csv at a time
+CHUNKSIZE = 500000
+
+MONTH = re.compile(r'(\d{4}-\d{2})')
+QUARTER = re.compile(r'^(\d{4})-Q([1-4])$')
+LEGACY_CSV = re.compile(r'^\d{4}-\d{2}\.csv$')
+
+
+def partition_path(store, region, month):
+    return os.path.join(store, region, month + '.parquet')
+
+
+def month_of(filename):
+    # '.../tweet-extractor-london/2017-06.csv' -> '2017-06'
+    found = MONTH.findall(os.path.basename(filename))
+    if not found:
+        raise ValueError("no YYYY-MM in file name %s" % filename)
+    return found[0]
+
+
+def parse_ids(values):
+    # ids written as '123' or '123.0' -> (int64, valid mask); parsed as
+    # integers all the way so 18-digit ids keep every digit
+    s = pd.Series(values, dtype=object).astype(str).str.replace(r'\.0$', '', regex=True)
+    valid = s.str.match(r'^\d{1,19}$').values.astype(bool)
+    ids = np.full(len(s), -1, dtype=np.int64)
+    ids[valid] = s[valid].astype(np.int64).values
+    return ids, valid
+
+
+def parse_times(values):
+    # twitter time strings (raw legacy files), '%Y-%m-%d %H:%M:%S'
+    # (filtergeo output) or the same with fractions of a second (later
+    # exports such as tw_15_17.csv) -> epoch seconds, NAT when none fits
+    epoch = tweet_time.to_epoch(values)
+    values = pd.Series(values)
+    for fmt in ['%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M:%S.%f']:
+        other = epoch == tweet_time.NAT
+        if not other.any():
+            break
+        t = pd.to_datetime(values[other], format=fmt, errors='coerce')
+        epoch[other] = t.values.astype('datetime64[s]').view(np.int64)
+    return epoch
+
+
+def fix_legacy(df):
+    # legacy csv chunk (any column names, 'time' or 'created_at' sixth,
+    # everything as strings) -> frame with the store schema
+    df = df.iloc[:, :len(COLUMNS)]
+    df.columns = COLUMNS
+    df = df[df.location != 'None']
+    ids, valid_id = parse_ids(df['id'].values)
+    userids, valid_user = parse_ids(df['userid'].values)
+    out = pd.DataFrame({
+        'id': ids,
+        'text': df['text'].values,
+        'userid': userids,
+        'lat': pd.to_numeric(df['lat'], errors='coerce').values,
+        'lon': pd.to_numeric(df['lon'], errors='coerce').values,
+        'created_at': parse_times(df['created_at'].values),
+        'location': df['location'].values,
+    }, columns=COLUMNS)
+    return out[valid_id & valid_user].reset_index(drop=True)
+
+
+def to_table(df):
+    return pa.Table.from_pandas(df[COLUMNS], schema=SCHEMA, preserve_index=False)
+
+
+class PartitionWriter(object):
+    # writes a partition chunk by chunk (one row group each) to a temporary
+    # file that replaces the partition on close
+
+    def __init__(self, path):
+        self.path = path
+        self.tmp = path + '.tmp'
+        self.rows = 0
+        folder = os.path.dirname(path)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+        self.writer = pq.ParquetWriter(self.tmp, SCHEMA, compression=COMPRESSION)
+
+    def write(self, df):
+        if len(df):
+            self.writer.write_table(to_table(df))
+            self.rows = self.rows + len(df)
+
+    def close(self):
+        self.writer.close()
+        os.rename(self.tmp, self.path)
+
+
+def write_partition(df, store, region, month):
+    writer = PartitionWriter(partition_path(store, region, month))
+    writer.write(df)
+    writer.close()
+    return writer.rows
+
+
+def migrate_file(filename, store, region, chunksize=CHUNKSIZE):
+    # one legacy csv into its month partition, chunksize rows at a time;
+    # malformed lines are skipped with a warning
+    writer = PartitionWriter(partition_path(store, region, month_of(filename)))
+    read = 0
+    for chunk in pd.read_csv(filename, encoding='utf-8', dtype=str, keep_default_na=False,
+                             on_bad_lines='warn', chunksize=chunksize):
+        read = read + len(chunk)
+        writer.write(fix_legacy(chunk))
+    writer.close()
+    return {'file': filename, 'partition': writer.path, 'rows_read': read,
+            'rows_written': writer.rows}
+
+
+def migrate_folder(directory, store, region, workers=1, chunksize=CHUNKSIZE):
+    # every YYYY-MM.csv in directory, workers files at a time
+    files = [os.path.join(directory, f) for f in sorted(os.listdir(directory))
+             if LEGACY_CSV.match(f)]
+    migrate = partial(migrate_file, store=store, region=region, chunksize=chunksize)
+    if workers <= 1 or len(files) <= 1:
+        results = [migrate(f) for f in files]
+    else:
+        pool = Pool(min(workers, len(files)))
+        try:
+            results = pool.map(migrate, files, chunksize=1)
+        finally:
+            pool.close()
+            pool.join()
+    report = pd.DataFrame(results, columns=['file', 'partition', 'rows_read', 'rows_written'])
+    print(report.to_string(index=False))
+    return report
+
+
+def store_months(directories, store, region, workers=1, csv=False, **options):
+    # ingest month folders into <store>/<region>/<YYYY-MM>.parquet, and
+    # into the legacy directory + '.csv' as well when csv is set
+    for directory, df, counts in tweet_ingest.ingest_months(directories, workers, **options):
+        month = month_of(os.path.basename(os.path.normpath(directory)))
+        rows = write_partition(df, store, region, month)
+        print("%s %s %s count of tweet %d" % (directory, region, month, rows))
+        tweet_ingest.report_counts(counts)
+        if csv:
+            tweet_ingest.write_legacy_csv(df, directory + '.csv')
+
+
+def _months_between(first, last):
+    start = pd.Period(first, freq='M')
+    end = pd.Period(last, freq='M')
+    return [str(p) for p in pd.period_range(start, end, freq='M')]
+
+
+def _bounds(period):
+    # first and last month of '2016', '2016-Q3' or '2016-07'
+    period = period.strip()
+    q = QUARTER.match(period)
+    if q:
+        year, quarter = int(q.group(1)), int(q.group(2))
+        return ('%d-%02d' % (year, 3 * quarter - 2), '%d-%02d' % (year, 3 * quarter))
+    if re.match(r'^\d{4}$', period):
+        return (period + '-01', period + '-12')
+    if re.match(r'^\d{4}-\d{2}$', period):
+        return (period, period)
+    raise ValueError("unknown period %s" % period)
+
+
+def months_of(period):
+    # '2016-Q3' -> ['2016-07', '2016-08', '2016-09'];
+    # '2015-08..2016-01' and '2015-Q3..2016-Q1' include both ends
+    if '..' in period:
+        first, last = period.split('..')
+        return _months_between(_bounds(first)[0], _bounds(last)[1])
+    return _months_between(*_bounds(period))
+
+
+def partitions(store, region):
+    # months stored for a region
+    folder = os.path.join(store, region)
+    if not os.path.exists(folder):
+        return []
+    return sorted(f[:-len('.parquet')] for f in os.listdir(folder)
+                  if f.endswith('.parquet') and MONTH.match(f))
+
+
+def load(store, region, period, columns=None):
+    # tweets of a region over a period, read from the matching month
+    # partitions only and, when columns is given, from those columns only
+    wanted = set(months_of(period))
+    paths = [partition_path(store, region, month)
+             for month in partitions(store, region) if month in wanted]
+    if columns is not None:
+        columns = list(columns)
+    if not paths:
+        return pd.DataFrame(columns=columns or COLUMNS)
+    tables = [pq.read_table(path, columns=columns) for path in paths]
+    return pa.concat_tables(tables).to_pandas()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 11:02:27 2026
+
+twitter timestamps, shared by the ingest, temporal_revise.py and getTrajectory.py
+
+functions provide
+1. parse a whole column of 'Tue Jun 13 20:00:01 +0000 2017' strings into
+   int64 epoch seconds in one call, NaT for invalid strings
+2. epoch seconds of a datetime column, a view when it already is epoch
+
+@author: chenzhong
+"""
+
+import numpy as np
+import pandas as pd
+
+TWITTER_TIME_FORMAT = '%a %b %d %H:%M:%S +0000 %Y'
+TWITTER_TIME_LENGTH = 30
+
+# int64 value of NaT, so an epoch array views straight into datetime64
+NAT = np.iinfo(np.int64).min
+
+MONTHS = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun',
+          'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+WEEKDAYS = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+
+# character positions in 'Tue Jun 13 20:00:01 +0000 2017'
+_SPACES = [3, 7, 10, 19, 25]
+_COLONS = [13, 16]
+_ZONE = slice(20, 25)
+_DIGITS = [8, 9, 11, 12, 14, 15, 17, 18, 21, 22, 23, 24, 26, 27, 28, 29]
+
+
+def _key(codes):
+    # three characters -> one integer for comparison
+    return (codes[..., 0] << 16) | (codes[..., 1] << 8) | codes[..., 2]
+
+
+def _code_keys(names):
+    return _key(np.array([[ord(c) for c in name] for name in names], dtype=np.int64))
+
+
+_MONTH_KEYS = _code_keys(MONTHS)
+_WEEKDAY_KEYS = _code_keys(WEEKDAYS)
+
+
+def _number(digits, start, width):
+    n = np.zeros(len(digits), dtype=np.int64)
+    for i in range(start, start + width):
+        n = n * 10 + digits[:, i]
+    return n
+
+
+def to_epoch(values):
+    # int64 epoch seconds (UTC), NAT for null, short, long or malformed
+    # strings; the cast is one character wider than a timestamp, so a longer
+    # string is not cut down to a valid-looking one
+    values = pd.Series(values, dtype=object)
+    null = values.isnull().values
+    width = TWITTER_TIME_LENGTH + 1
+    text = np.asarray(values.where(~null, ''), dtype='U%d' % width)
+    exact = np.char.str_len(text) == TWITTER_TIME_LENGTH
+    codes = text.view(np.uint32).reshape(len(text), width)[:, :TWITTER_TIME_LENGTH].astype(np.int64)
+
+    digits = codes - ord('0')
+    ok = ~null & exact
+    ok &= ((digits[:, _DIGITS] >= 0) & (digits[:, _DIGITS] <= 9)).all(axis=1)
+    ok &= (codes[:, _SPACES] == ord(' ')).all(axis=1)
+    ok &= (codes[:, _COLONS] == ord(':')).all(axis=1)
+    ok &= (codes[:, _ZONE] == [ord(c) for c in '+0000']).all(axis=1)
+    ok &= np.isin(_key(codes[:, 0:3]), _WEEKDAY_KEYS)
+
+    month = (_key(codes[:, 4:7])[:, None] == _MONTH_KEYS[None, :])
+    ok &= month.any(axis=1)
+    month = month.argmax(axis=1)
+    day = _number(digits, 8, 2)
+    hour = _number(digits, 11, 2)
+    minute = _number(digits, 14, 2)
+    second = _number(digits, 17, 2)
+    year = _number(digits, 26, 4)
+
+    months = (year - 1970) * 12 + month
+    first = months.astype('datetime64[M]').astype('datetime64[D]').astype(np.int64)
+    ndays = (months + 1).astype('datetime64[M]').astype('datetime64[D]').astype(np.int64) - first
+    ok &= (day >= 1) & (day <= ndays) & (hour < 24) & (minute < 60) & (second < 61)
+
+    epoch = (first + day - 1) * 86400 + hour * 3600 + minute * 60 + second
+    epoch[~ok] = NAT
+    return epoch
+
+
+def epoch_seconds(values):
+    # int64 epoch seconds of a datetime64 or epoch column; the epoch columns
+    # the ingest writes come back as they are, without a copy
+    values = np.asarray(values)
+    if values.dtype == np.int64:
+        return values
+    return values.astype('datetime64[s]').view(np.int64)
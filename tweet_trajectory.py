@@ -0,0 +1,161 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 17:48:21 2026
+
+per-user trajectory index: tweets sorted once by (userid, time) with the
+offsets of every user, as in a CSR matrix
+
+functions provide
+1. build the index from the userid/time columns of a tweet frame, plus any
+   other numeric columns (lon, lat) to keep in the same order
+2. the time-ordered points of one user as slices of the sorted arrays, no
+   scan of the whole frame and no copy
+3. many users at once as a smaller index of the same form
+4. save the index as .npy files next to the data and map it back in,
+   rebuilt when the data file changes
+
+@author: chenzhong
+"""
+
+import os
+import json
+import numpy as np
+
+# the row of every point in the frame the index was built from
+ROW = 'row'
+
+
+class TrajectoryIndex(object):
+    # users: sorted distinct user ids; offsets: len(users) + 1 positions, the
+    # points of users[k] are offsets[k]:offsets[k + 1] of every column
+
+    def __init__(self, users, offsets, columns):
+        self.users = users
+        self.offsets = offsets
+        self.columns = columns
+
+    @classmethod
+    def build(cls, userid, time, **columns):
+        # one stable sort by (userid, time); time is kept as the 'time' column
+        userid = np.asarray(userid, dtype=np.int64)
+        time = np.asarray(time)
+        order = np.lexsort((time, userid))
+        sorted_ids = userid[order]
+        starts = np.flatnonzero(np.r_[True, sorted_ids[1:] != sorted_ids[:-1]])[:len(order)]
+        out = {ROW: order.astype(np.int64), 'time': time[order]}
+        for name, values in columns.items():
+            out[name] = np.asarray(values)[order]
+        return cls(sorted_ids[starts], np.r_[starts, len(order)].astype(np.int64), out)
+
+    @classmethod
+    def from_frame(cls, df, columns=('lon', 'lat'), time='time'):
+        return cls.build(df['userid'].values, df[time].values,
+                         **dict((c, df[c].values) for c in columns))
+
+    def __len__(self):
+        return len(self.users)
+
+    def counts(self):
+        # number of points of every user, aligned with users
+        return np.diff(self.offsets)
+
+    def span(self, user):
+        # (start, end) of a user, (0, 0) when the user has no points
+        k = np.searchsorted(self.users, user)
+        if k == len(self.users) or self.users[k] != user:
+            return 0, 0
+        return self.offsets[k], self.offsets[k + 1]
+
+    def user(self, user, columns=None):
+        # dict of column -> time-ordered points of one user, views of the
+        # index arrays
+        start, end = self.span(user)
+        return dict((name, self.columns[name][start:end])
+                    for name in (columns or self.columns))
+
+    def rows(self, user):
+        # frame rows of a user in time order, for df.iloc
+        start, end = self.span(user)
+        return self.columns[ROW][start:end]
+
+    def take(self, users):
+        # index restricted to users (any order, missing ones dropped), built
+        # by one gather instead of a loop over users
+        users = np.unique(np.asarray(users, dtype=np.int64))
+        k = np.searchsorted(self.users, users)
+        k = k[k < len(self.users)]
+        k = k[np.isin(self.users[k], users)]
+        starts, ends = self.offsets[k], self.offsets[k + 1]
+        lengths = ends - starts
+        offsets = np.r_[0, np.cumsum(lengths)].astype(np.int64)
+        gather = np.arange(offsets[-1], dtype=np.int64) - np.repeat(offsets[:-1] - starts, lengths)
+        columns = dict((name, values[gather]) for name, values in self.columns.items())
+        return TrajectoryIndex(self.users[k], offsets, columns)
+
+    def where(self, keep):
+        # index of the points where keep (one flag per point) is True, users
+        # left without points dropped
+        keep = np.asarray(keep, dtype=bool)
+        seg = np.repeat(np.arange(len(self.users), dtype=np.int64), self.counts())
+        counts = np.bincount(seg[keep], minlength=len(self.users))
+        has = counts > 0
+        offsets = np.r_[0, np.cumsum(counts[has])].astype(np.int64)
+        columns = dict((name, values[keep]) for name, values in self.columns.items())
+        return TrajectoryIndex(self.users[has], offsets, columns)
+
+    def __iter__(self):
+        # (user, dict of column slices) for every user, in user id order
+        for k in range(len(self.users)):
+            start, end = self.offsets[k], self.offsets[k + 1]
+            yield self.users[k], dict((name, values[start:end])
+                                      for name, values in self.columns.items())
+
+    def save(self, folder, source=None):
+        # one .npy per array plus meta.json with the state of the source file
+        if not os.path.exists(folder):
+            os.makedirs(folder)
+        np.save(os.path.join(folder, 'users.npy'), self.users)
+        np.save(os.path.join(folder, 'offsets.npy'), self.offsets)
+        for name, values in self.columns.items():
+            np.save(os.path.join(folder, name + '.npy'), values)
+        meta = {'columns': sorted(self.columns), 'source': source_state(source)}
+        with open(os.path.join(folder, 'meta.json'), 'w') as f:
+            json.dump(meta, f, indent=2, sort_keys=True)
+
+    @classmethod
+    def load(cls, folder, source=None, mmap_mode='r'):
+        # None when the folder is missing or the source changed since save
+        meta_name = os.path.join(folder, 'meta.json')
+        if not os.path.exists(meta_name):
+            return None
+        with open(meta_name) as f:
+            meta = json.load(f)
+        if source is not None and meta['source'] != source_state(source):
+            return None
+        read = lambda name: np.load(os.path.join(folder, name + '.npy'), mmap_mode=mmap_mode)
+        return cls(read('users'), read('offsets'), dict((name, read(name)) for name in meta['columns']))
+
+
+def source_state(filename):
+    if filename is None or not os.path.exists(filename):
+        return None
+    st = os.stat(filename)
+    return [st.st_size, int(st.st_mtime)]
+
+
+def index_name(filename):
+    # tw_15_17.csv -> tw_15_17.trajectories
+    return os.path.splitext(filename)[0] + '.trajectories'
+
+
+def trajectory_index(df, filename, columns=('lon', 'lat'), time='time'):
+    # the saved index of filename when it is still current, else built from
+    # df (the frame read from filename, or a selection of its rows) and saved
+    folder = index_name(filename)
+    index = TrajectoryIndex.load(folder, filename)
+    if index is None or not set(columns) <= set(index.columns) or \
+            len(index.columns[ROW]) != len(df):
+        index = TrajectoryIndex.from_frame(df, columns, time)
+        index.save(folder, filename)
+    return index
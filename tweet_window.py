@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 19:31:12 2026
+
+time-window queries over tweets sorted once by their epoch time
+
+functions provide
+1. sort the tweet columns once by time and find a time range (a period
+   such as '2016-Q3' or '2015-08..2016-01', or start/end dates or epoch
+   seconds) by binary search, as a slice
+2. hour-of-day and day-of-week selections from buckets kept in time order,
+   so a range inside them is a binary search as well
+3. user and area filters applied to the selected rows only, not to the
+   whole frame
+
+hours and weekdays are UTC, as created_at is; rows without a time (NaT) are
+left out of the index
+
+@author: chenzhong
+"""
+
+import numpy as np
+import pandas as pd
+
+import tweet_store
+from tweet_time import NAT
+
+DAY = 86400
+# 1970-01-01 was a Thursday, weekday 3 with Monday 0
+EPOCH_WEEKDAY = 3
+
+
+def to_epoch(value):
+    # epoch seconds of an int or a date/time string ('2016-07-01',
+    # '2016-07-01 18:00:00')
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    return int(pd.Timestamp(value).value // 10 ** 9)
+
+
+def period_bounds(period):
+    # [start, end) epoch seconds of a store period ('2016-Q3', '2016',
+    # '2015-08..2016-01')
+    months = tweet_store.months_of(period)
+    start = np.datetime64(months[0], 'M')
+    end = np.datetime64(months[-1], 'M') + 1
+    return (int(start.astype('datetime64[s]').astype(np.int64)),
+            int(end.astype('datetime64[s]').astype(np.int64)))
+
+
+def _buckets(keys, n):
+    # positions grouped by key, each group in position (so time) order
+    order = np.argsort(keys, kind='stable')
+    offsets = np.r_[0, np.cumsum(np.bincount(keys, minlength=n))].astype(np.int64)
+    return order, offsets
+
+
+class TimeIndex(object):
+    # columns: dict of arrays sorted by columns['time']; hour and weekday
+    # buckets hold positions of that order
+
+    def __init__(self, time, **columns):
+        time = np.asarray(time, dtype=np.int64)
+        # NaT would land in the hour 8 / Sunday buckets through // and %
+        order = np.flatnonzero(time != NAT)
+        order = order[np.argsort(time[order], kind='stable')]
+        self.columns = dict((name, np.asarray(values)[order]) for name, values in columns.items())
+        self.columns['time'] = time[order]
+        self.hour = ((self.columns['time'] % DAY) // 3600).astype(np.int8)
+        self.weekday = ((self.columns['time'] // DAY + EPOCH_WEEKDAY) % 7).astype(np.int8)
+        self.by_hour = _buckets(self.hour, 24)
+        self.by_weekday = _buckets(self.weekday, 7)
+
+    @classmethod
+    def from_frame(cls, df, columns=('id', 'userid', 'lon', 'lat'), time='time'):
+        return cls(df[time].values, **dict((c, df[c].values) for c in columns))
+
+    def __len__(self):
+        return len(self.columns['time'])
+
+    def between(self, start=None, end=None, period=None):
+        # slice of the rows with start <= time < end, or inside period
+        if period is not None:
+            start, end = period_bounds(period)
+        time = self.columns['time']
+        lo = 0 if start is None else np.searchsorted(time, to_epoch(start), 'left')
+        hi = len(time) if end is None else np.searchsorted(time, to_epoch(end), 'left')
+        return slice(int(lo), int(max(lo, hi)))
+
+    def _from_buckets(self, buckets, keys, window):
+        # positions of the rows in any of the keys' buckets and in window,
+        # in time order
+        order, offsets = buckets
+        parts = []
+        for key in np.unique(keys):
+            bucket = order[offsets[key]:offsets[key + 1]]
+            lo, hi = np.searchsorted(bucket, [window.start, window.stop])
+            parts.append(bucket[lo:hi])
+        if not parts:
+            return np.zeros(0, dtype=np.int64)
+        return np.sort(np.concatenate(parts)) if len(parts) > 1 else parts[0]
+
+    def select(self, start=None, end=None, period=None, hours=None, weekdays=None,
+               users=None, areas=None, area='area'):
+        # rows matching every given condition, as a slice when only a time
+        # range is asked and as time-ordered positions otherwise; hours
+        # 0-23, weekdays 0 (Monday) - 6
+        window = self.between(start, end, period)
+        if hours is None and weekdays is None and users is None and areas is None:
+            return window
+        if hours is not None:
+            rows = self._from_buckets(self.by_hour, np.atleast_1d(hours), window)
+            if weekdays is not None:
+                rows = rows[np.isin(self.weekday[rows], weekdays)]
+        elif weekdays is not None:
+            rows = self._from_buckets(self.by_weekday, np.atleast_1d(weekdays), window)
+        else:
+            rows = np.arange(window.start, window.stop, dtype=np.int64)
+        if users is not None:
+            rows = rows[np.isin(self.columns['userid'][rows], users)]
+        if areas is not None:
+            rows = rows[np.isin(self.columns[area][rows], areas)]
+        return rows
+
+    def get(self, rows, columns=None):
+        # dict of column -> values of rows (views for a slice)
+        return dict((name, self.columns[name][rows]) for name in (columns or self.columns))
+
+    def frame(self, rows, columns=None):
+        names = columns or sorted(self.columns)
+        return pd.DataFrame(self.get(rows, names), columns=names)
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 20:02:47 2026
+
+quarterly user activity matrix for the user selection of getUsers.py
+
+functions provide
+1. read the users_YY_qN.csv files (user_id, records, distinct locations)
+   of any list of quarters with integer user ids
+2. one wide frame user_id, rec_15q3 ... rec_17q2, loc_15q3 ... loc_17q2 from
+   a single concat and pivot, instead of a merge per quarter
+3. the avg/min/max record and location columns and the per-quarter
+   records per location (avg_15q3 ...), on whole arrays
+4. make the users_YY_qN.csv files in one pass over the tweet store: records
+   and distinct locations (place name, MSOA or rounded coordinates) per user
+   and quarter, by hash aggregation that spills to disk past a row limit
+
+@author: chenzhong
+"""
+
+import os
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+import tweet_time
+import tweet_frame
+import tweet_store
+import tweet_geocode
+from tweet_mobility import quarters_of
+
+# rows of (userid, quarter, location) counts kept in memory before spilling
+MAX_ROWS = 5000000
+# spill files are split by user so each part is aggregated on its own
+PARTS = 16
+# rows read from a store partition at a time
+BATCH = 500000
+
+KEYS = ['userid', 'quarter', 'loc']
+
+# summary columns of add_summary, between the loc_ and avg_ columns
+SUMMARY = ['avg_rec', 'avg_loc', 'min_loc', 'max_loc', 'min_rec', 'max_rec']
+
+
+def quarters_between(first, last):
+    # '2015-Q3', '2017-Q2' -> ['2015-Q3', '2015-Q4', ..., '2017-Q2']
+    periods = pd.period_range(pd.Period(first, freq='Q'), pd.Period(last, freq='Q'), freq='Q')
+    return ['%d-Q%d' % (p.year, p.quarter) for p in periods]
+
+
+def suffix(quarter):
+    # '2015-Q3' -> '15q3', as in the rec_15q3 / loc_15q3 columns
+    year, q = quarter.split('-Q')
+    return '%sq%s' % (year[2:], q)
+
+
+def quarter_columns(prefix, quarters):
+    # 'rec', ['2015-Q3', '2015-Q4'] -> ['rec_15q3', 'rec_15q4']
+    return ['%s_%s' % (prefix, suffix(q)) for q in quarters]
+
+
+def users_name(root, quarter):
+    # '2015-Q3' -> root/users_15_q3.csv
+    year, q = quarter.split('-Q')
+    return os.path.join(root, 'users_%s_q%s.csv' % (year[2:], q))
+
+
+def read_quarter(filename):
+    # user_id, rec, loc of one users_YY_qN.csv (no header)
+    df = pd.read_csv(filename, header=None, dtype={0: str})
+    df = df.iloc[:, :3]
+    df.columns = ['user_id', 'rec', 'loc']
+    df['user_id'] = tweet_frame.as_int64(df['user_id'])
+    return df
+
+
+def activity_matrix(frames, quarters):
+    # frames: one user_id/rec/loc frame per quarter. Users come in order of
+    # first appearance, counts are 0 in the quarters a user is missing from
+    # (a user listed twice in a quarter gets the sum)
+    sizes = [len(df) for df in frames]
+    ids = np.concatenate([df['user_id'].values for df in frames]).astype(np.int64)
+    column = np.repeat(np.arange(len(frames)), sizes)
+    row, users = pd.factorize(ids)
+    rec = np.zeros((len(users), len(frames)), dtype=np.int64)
+    loc = np.zeros((len(users), len(frames)), dtype=np.int64)
+    np.add.at(rec, (row, column), np.concatenate([df['rec'].values for df in frames]).astype(np.int64))
+    np.add.at(loc, (row, column), np.concatenate([df['loc'].values for df in frames]).astype(np.int64))
+    out = pd.DataFrame(np.column_stack([rec, loc]),
+                       columns=quarter_columns('rec', quarters) + quarter_columns('loc', quarters))
+    out.insert(0, 'user_id', np.asarray(users, dtype=np.int64))
+    return out
+
+
+def add_summary(df, quarters):
+    # avg_rec, avg_loc, min_loc, max_loc, min_rec, max_rec, then the records
+    # per location of every quarter (avg_15q3 ...; inf or nan where a
+    # quarter has no location)
+    rec = df[quarter_columns('rec', quarters)].values
+    loc = df[quarter_columns('loc', quarters)].values
+    df['avg_rec'] = rec.mean(axis=1)
+    df['avg_loc'] = loc.mean(axis=1)
+    df['min_loc'] = loc.min(axis=1)
+    df['max_loc'] = loc.max(axis=1)
+    df['min_rec'] = rec.min(axis=1)
+    df['max_rec'] = rec.max(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = rec / loc.astype(np.float64)
+    for i, name in enumerate(quarter_columns('avg', quarters)):
+        df[name] = ratio[:, i]
+    return df
+
+
+def quarter_name(code):
+    # year * 4 + quarter - 1 -> '2015-Q3'
+    return '%d-Q%d' % (code // 4, code % 4 + 1)
+
+
+def location_keys(batch, by='place', layer=None, precision=3):
+    # int64 location key of every tweet, -1 for none: hash of the place
+    # name, position of the area in layer (a tweet_geocode.AreaLayer), or
+    # lat/lon rounded to precision decimals
+    if by == 'place':
+        names = pd.Series(batch['location'].values, dtype=object)
+        keys = pd.util.hash_array(names.fillna('').values.astype(object)).view(np.int64)
+        missing = names.isnull().values | names.isin(['', 'None']).values
+        keys = np.where(missing, -1, keys & 0x7fffffffffffffff)
+        return keys
+    lat = np.asarray(batch['lat'].values, dtype=np.float64)
+    lon = np.asarray(batch['lon'].values, dtype=np.float64)
+    if by == 'msoa':
+        found = tweet_geocode.assign_areas(lon, lat, [layer])[layer.name].values
+        return pd.Categorical(found, categories=layer.codes).codes.astype(np.int64)
+    if by == 'coords':
+        scale = 10 ** precision
+        with np.errstate(invalid='ignore'):
+            y = np.round(lat * scale) + 90 * scale
+            x = np.round(lon * scale) + 180 * scale
+        ok = np.isfinite(x) & np.isfinite(y)
+        keys = np.full(len(lat), -1, dtype=np.int64)
+        keys[ok] = y[ok].astype(np.int64) * (360 * scale + 1) + x[ok].astype(np.int64)
+        return keys
+    raise ValueError("unknown location key %s" % by)
+
+
+class QuarterAggregator(object):
+    # tweet counts per (userid, quarter, location), grouped in memory and
+    # spilled by user to parts files when more than max_rows distinct rows
+    # are held
+
+    def __init__(self, max_rows=MAX_ROWS, parts=PARTS, folder=None):
+        self.max_rows = max_rows
+        self.parts = parts
+        self.folder = folder
+        self.pending = []
+        self.held = 0
+        self.spills = 0
+
+    def _reduce(self, frames):
+        df = pd.concat(frames, ignore_index=True)
+        return df.groupby(KEYS, sort=False)['n'].sum().reset_index()
+
+    def add(self, userid, quarter, loc):
+        df = pd.DataFrame({'userid': userid, 'quarter': quarter, 'loc': loc, 'n': 1},
+                          columns=KEYS + ['n'])
+        df = self._reduce([df])
+        self.pending.append(df)
+        self.held += len(df)
+        if self.held > self.max_rows:
+            df = self._reduce(self.pending)
+            self.pending, self.held = [df], len(df)
+            if self.held > self.max_rows // 2:
+                self._spill(df)
+
+    def _spill(self, df):
+        if self.folder is None:
+            self.folder = tempfile.mkdtemp(prefix='user_quarters_')
+        part = df['userid'].values % self.parts
+        for k in range(self.parts):
+            rows = df.values[part == k]
+            if len(rows):
+                np.save(os.path.join(self.folder, 'part_%03d_%05d.npy' % (k, self.spills)), rows)
+        self.spills += 1
+        self.pending, self.held = [], 0
+
+    def _parts(self):
+        # one frame of (userid, quarter, loc, n) per part of the users
+        if not self.spills:
+            if self.pending:
+                yield self._reduce(self.pending)
+            return
+        if self.pending:
+            self._spill(self._reduce(self.pending))
+        files = sorted(os.listdir(self.folder))
+        for k in range(self.parts):
+            prefix = 'part_%03d_' % k
+            frames = [pd.DataFrame(np.load(os.path.join(self.folder, f)), columns=KEYS + ['n'])
+                      for f in files if f.startswith(prefix)]
+            if frames:
+                yield self._reduce(frames)
+
+    def result(self):
+        # userid, quarter, rec (tweets) and loc (distinct locations) per user
+        # and quarter, sorted by quarter and user
+        out = []
+        try:
+            for df in self._parts():
+                g = df.groupby(['userid', 'quarter'], sort=False)
+                rec = g['n'].sum()
+                loc = df[df['loc'] >= 0].groupby(['userid', 'quarter'], sort=False)['loc'].nunique()
+                out.append(pd.DataFrame({'rec': rec, 'loc': loc.reindex(rec.index).fillna(0)})
+                           .reset_index())
+        finally:
+            if self.folder is not None:
+                shutil.rmtree(self.folder, ignore_errors=True)
+                self.folder = None
+        if not out:
+            return pd.DataFrame(columns=['userid', 'quarter', 'rec', 'loc'])
+        df = pd.concat(out, ignore_index=True)
+        df['loc'] = df['loc'].astype(np.int64)
+        return df.sort_values(['quarter', 'userid']).reset_index(drop=True)
+
+
+def aggregate_store(store, region, period=None, by='place', layer=None, precision=3,
+                    max_rows=MAX_ROWS, parts=PARTS, batch=BATCH):
+    # records and distinct locations per user and quarter over the store
+    # partitions of a period (all of them by default), read batch rows at a
+    # time; raises when the store has no partition in the period
+    months = tweet_store.partitions(store, region)
+    if period is not None:
+        wanted = set(tweet_store.months_of(period))
+        months = [m for m in months if m in wanted]
+    if not months:
+        raise ValueError("no %s partitions in %s for %s"
+                         % (region, store, period if period is not None else 'any period'))
+    columns = ['userid', 'created_at'] + (['location'] if by == 'place' else ['lat', 'lon'])
+    agg = QuarterAggregator(max_rows, parts)
+    for month in months:
+        f = pq.ParquetFile(tweet_store.partition_path(store, region, month))
+        for b in f.iter_batches(batch_size=batch, columns=columns):
+            df = b.to_pandas()
+            df = df[df['created_at'].values != tweet_time.NAT]
+            agg.add(df['userid'].values, quarters_of(df['created_at'].values),
+                    location_keys(df, by, layer, precision))
+    df = agg.result()
+    names = dict((q, quarter_name(q)) for q in df['quarter'].unique())
+    df['quarter'] = df['quarter'].map(names)
+    return df
+
+
+def write_users(df, root):
+    # root/users_YY_qN.csv (user_id, rec, loc, no header) for every quarter
+    # of an aggregate_store result; returns the quarters written
+    quarters = sorted(df['quarter'].unique())
+    for q in quarters:
+        part = df[df['quarter'] == q]
+        part[['userid', 'rec', 'loc']].to_csv(users_name(root, q), header=False, index=False)
+    return quarters
+
+
+def build(root, quarters):
+    # the activity matrix with its summary columns from the users_YY_qN.csv
+    # files of root
+    frames = [read_quarter(users_name(root, q)) for q in quarters]
+    return add_summary(activity_matrix(frames, quarters), quarters)
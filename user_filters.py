@@ -0,0 +1,187 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 20:48:09 2026
+
+declarative outlier filters for the active-user selection of getUsers.py
+
+functions provide
+1. rules over one or more columns: std band (|x - mean| <= k * std),
+   quantile band (q_low < x < q_high) and thresholds (x > above, x < below)
+2. evaluate a list of rules as one boolean mask over the frame, each rule
+   taking its statistics from the rows kept so far (as the chained
+   remove_std / remove_quantile calls did) or, with sequential=False, all
+   of them from the same rows in one batch; the frame is copied once
+3. the same over a frame read in chunks, for user tables that do not fit
+   in memory: mean and std from running sums, quantiles from a mergeable
+   sketch, one pass over the chunks per step
+
+@author: chenzhong
+"""
+
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+
+Rule = namedtuple('Rule', ['kind', 'columns', 'args'])
+
+# items kept per level of a quantile sketch
+SKETCH_SIZE = 2048
+
+
+def _names(columns):
+    if isinstance(columns, str):
+        return [columns]
+    return list(columns)
+
+
+def std_band(columns, k=3):
+    return Rule('std', _names(columns), (k,))
+
+
+def quantile_band(columns, low, high):
+    return Rule('quantile', _names(columns), (low, high))
+
+
+def threshold(columns, above=None, below=None):
+    return Rule('threshold', _names(columns), (above, below))
+
+
+def _steps(spec, sequential):
+    # (rule, columns) groups sharing the same statistics: one per column of
+    # every rule when sequential, one per rule otherwise
+    for rule in spec:
+        if sequential:
+            for col in rule.columns:
+                yield rule, [col]
+        else:
+            yield rule, rule.columns
+
+
+def _bounds(rule, stats=None):
+    # stats: (mean, std, quantile function) of a column -> keep test
+    if rule.kind == 'threshold':
+        above, below = rule.args
+        return lambda x: ((x > above) if above is not None else True) & \
+            ((x < below) if below is not None else True)
+    mean, std, quantile = stats
+    if rule.kind == 'std':
+        k = rule.args[0]
+        return lambda x: np.abs(x - mean) <= k * std
+    if rule.kind == 'quantile':
+        low, high = quantile(rule.args[0]), quantile(rule.args[1])
+        return lambda x: (x < high) & (x > low)
+    raise ValueError("unknown rule %s" % rule.kind)
+
+
+def _frame_stats(values):
+    s = pd.Series(values)
+    return s.mean(), s.std(), s.quantile
+
+
+def evaluate(df, spec, mask=None, sequential=True):
+    # boolean mask of the rows of df passing every rule of spec, starting
+    # from mask (all rows by default)
+    mask = np.ones(len(df), dtype=bool) if mask is None else np.array(mask, dtype=bool)
+    for rule, columns in _steps(spec, sequential):
+        kept = np.flatnonzero(mask)
+        keep = np.ones(len(kept), dtype=bool)
+        for col in columns:
+            x = df[col].values[kept]
+            stats = _frame_stats(x) if rule.kind != 'threshold' else None
+            with np.errstate(invalid='ignore'):
+                keep &= np.asarray(_bounds(rule, stats)(x), dtype=bool)
+        mask[kept[~keep]] = False
+    return mask
+
+
+def apply(df, spec, mask=None, sequential=True):
+    return df[evaluate(df, spec, mask, sequential)]
+
+
+class QuantileSketch(object):
+    # mergeable quantile sketch: levels of at most size items, an item of
+    # level h standing for 2 ** h values; a full level is sorted and every
+    # other item (random start) moves up a level
+
+    def __init__(self, size=SKETCH_SIZE, seed=0):
+        self.size = size
+        self.levels = [np.zeros(0)]
+        self.rng = np.random.RandomState(seed)
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        self.levels[0] = np.concatenate([self.levels[0], values[~np.isnan(values)]])
+        h = 0
+        while h < len(self.levels):
+            while len(self.levels[h]) > self.size:
+                items = np.sort(self.levels[h])
+                n = len(items) // 2 * 2
+                rest, items = items[n:], items[:n]
+                if h + 1 == len(self.levels):
+                    self.levels.append(np.zeros(0))
+                self.levels[h + 1] = np.concatenate(
+                    [self.levels[h + 1], items[self.rng.randint(2)::2]])
+                self.levels[h] = rest
+            h += 1
+
+    def quantile(self, q):
+        items = np.concatenate(self.levels)
+        if not len(items):
+            return np.nan
+        weights = np.concatenate([np.full(len(l), 2.0 ** h) for h, l in enumerate(self.levels)])
+        order = np.argsort(items, kind='stable')
+        items, cdf = items[order], np.cumsum(weights[order])
+        return items[min(np.searchsorted(cdf, q * cdf[-1]), len(items) - 1)]
+
+
+class _ChunkStats(object):
+    # running count, sum and sum of squares plus a quantile sketch of a column
+
+    def __init__(self, sketch_size):
+        self.n = 0
+        self.total = 0.0
+        self.squares = 0.0
+        self.sketch = QuantileSketch(sketch_size)
+
+    def update(self, values, quantiles):
+        x = np.asarray(values, dtype=np.float64)
+        x = x[~np.isnan(x)]
+        self.n += len(x)
+        self.total += x.sum()
+        self.squares += (x ** 2).sum()
+        if quantiles:
+            self.sketch.update(x)
+
+    def stats(self):
+        mean = self.total / self.n if self.n else np.nan
+        var = (self.squares - self.n * mean ** 2) / (self.n - 1) if self.n > 1 else np.nan
+        return mean, np.sqrt(max(var, 0.0)), self.sketch.quantile
+
+
+def _keep_chunk(chunk, tests):
+    keep = np.ones(len(chunk), dtype=bool)
+    for col, test in tests:
+        with np.errstate(invalid='ignore'):
+            keep &= np.asarray(test(chunk[col].values), dtype=bool)
+    return keep
+
+
+def evaluate_chunks(chunks, spec, sequential=True, sketch_size=SKETCH_SIZE):
+    # rows passing spec over a table too big for memory. chunks is a
+    # function returning a fresh iterator of frames, e.g.
+    # lambda: pd.read_csv(name, chunksize=10 ** 6); it is read once per step
+    # plus once for the result. Quantiles are approximate
+    tests = []
+    for rule, columns in _steps(spec, sequential):
+        if rule.kind == 'threshold':
+            tests.extend((col, _bounds(rule)) for col in columns)
+            continue
+        stats = dict((col, _ChunkStats(sketch_size)) for col in columns)
+        for chunk in chunks():
+            kept = chunk[_keep_chunk(chunk, tests)]
+            for col in columns:
+                stats[col].update(kept[col].values, rule.kind == 'quantile')
+        tests.extend((col, _bounds(rule, stats[col].stats())) for col in columns)
+    out = [chunk[_keep_chunk(chunk, tests)] for chunk in chunks()]
+    return pd.concat(out) if out else pd.DataFrame()